@@ -0,0 +1,81 @@
+//! Benchmarks of the suffix list, independent of Python. The module is compiled in the same way
+//! build.rs compiles it, so the extension module does not have to be linked.
+//!
+//! cargo bench --bench suffix_list
+
+#[path = "../src/suffix_list.rs"]
+#[allow(dead_code)]
+mod suffix_list;
+
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use suffix_list::{compile_suffix_list, parse_suffix_list, CompiledSuffixList};
+
+static PUBLIC_SUFFIX_LIST: &str = include_str!("../src/public_suffix_list.dat");
+
+fn bench_parse_suffix_list(
+    criterion: &mut Criterion,
+) {
+    let mut group = criterion.benchmark_group("parse_suffix_list");
+    group.throughput(Throughput::Bytes(PUBLIC_SUFFIX_LIST.len() as u64));
+    group.bench_function(
+        "parse",
+        |bencher| bencher.iter(|| parse_suffix_list(black_box(PUBLIC_SUFFIX_LIST))),
+    );
+
+    let suffix_tree = parse_suffix_list(PUBLIC_SUFFIX_LIST);
+    group.bench_function(
+        "compile",
+        |bencher| bencher.iter(|| compile_suffix_list(black_box(&suffix_tree))),
+    );
+
+    let compiled = compile_suffix_list(&suffix_tree);
+    group.bench_function(
+        "load_and_validate",
+        |bencher| bencher.iter(
+            || {
+                let compiled_suffix_list = CompiledSuffixList::new(black_box(compiled.as_slice())).unwrap();
+                compiled_suffix_list.validate().unwrap();
+            }
+        ),
+    );
+    group.finish();
+}
+
+/// The domains cover the paths of the label walk: plain and multi label suffixes, deep subdomains,
+/// wildcard and exception rules, private suffixes, internationalized labels and invalid domains
+fn bench_parse_domain_parts(
+    criterion: &mut Criterion,
+) {
+    let compiled = compile_suffix_list(&parse_suffix_list(PUBLIC_SUFFIX_LIST));
+    let compiled_suffix_list = CompiledSuffixList::new(compiled.as_slice()).unwrap();
+
+    let mut group = criterion.benchmark_group("parse_domain_parts");
+    for (name, domain) in [
+        ("suffix_only", "com"),
+        ("domain", "example.com"),
+        ("multi_label_suffix", "example.co.uk"),
+        ("deep_subdomain", "a.b.c.d.e.f.g.example.co.uk"),
+        ("wildcard", "sub.example.ck"),
+        ("exception", "www.ck"),
+        ("private", "project.github.io"),
+        ("unicode", "例子.中国"),
+        ("punycode", "xn--fsqu00a.xn--fiqs8s"),
+        ("unknown_suffix", "example.notasuffix"),
+        ("invalid", "example..com"),
+    ] {
+        for include_private in [true, false] {
+            let section = if include_private { "all" } else { "icann" };
+            group.bench_with_input(
+                BenchmarkId::new(name, section),
+                domain,
+                |bencher, domain| bencher.iter(
+                    || compiled_suffix_list.parse_domain_sections(black_box(domain), include_private)
+                ),
+            );
+        }
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_parse_suffix_list, bench_parse_domain_parts);
+criterion_main!(benches);
@@ -63,6 +63,21 @@ def benchmark_pydomainextractor(
     print(f'pydomainextractor: {end - start}s')
 
 
+def benchmark_pydomainextractor_iter_file(
+    domains_file_path,
+):
+    extractor = pydomainextractor.DomainExtractor()
+
+    start = time.perf_counter()
+
+    for results in extractor.iter_file(domains_file_path):
+        pass
+
+    end = time.perf_counter()
+
+    print(f'pydomainextractor (iter_file, including reading the file): {end - start}s')
+
+
 def main():
     domains = []
     with open('10m_domains') as domains_file:
@@ -73,6 +88,7 @@ def main():
     benchmark_publicsuffix2(domains)
     benchmark_tld(domains)
     benchmark_pydomainextractor(domains)
+    benchmark_pydomainextractor_iter_file('10m_domains')
 
 
 if __name__ == '__main__':
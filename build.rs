@@ -0,0 +1,18 @@
+#[path = "src/suffix_list.rs"]
+#[allow(dead_code)]
+mod suffix_list;
+
+use std::env;
+use std::fs;
+use std::path::Path;
+
+fn main() {
+    println!("cargo:rerun-if-changed=src/public_suffix_list.dat");
+    println!("cargo:rerun-if-changed=src/suffix_list.rs");
+
+    let suffix_list_data = fs::read_to_string("src/public_suffix_list.dat").unwrap();
+    let compiled = suffix_list::compile_suffix_list(&suffix_list::parse_suffix_list(&suffix_list_data));
+
+    let out_dir = env::var_os("OUT_DIR").unwrap();
+    fs::write(Path::new(&out_dir).join("public_suffix_list.bin"), compiled).unwrap();
+}
@@ -1,7 +1,11 @@
+import os
 import typing
 
 from . import pydomainextractor
 
+ExtractResult = pydomainextractor.ExtractResult
+DomainMatcher = pydomainextractor.DomainMatcher
+
 
 class DomainExtractor:
     '''
@@ -12,11 +16,33 @@ class DomainExtractor:
     def __new__(
         cls,
         suffix_list_data: typing.Optional[str] = None,
+        cache_size: int = 0,
     ):
-        if suffix_list_data is None:
+        if suffix_list_data is None and cache_size == 0:
             if DomainExtractor.engine is None:
                 DomainExtractor.engine = pydomainextractor.DomainExtractor()
 
             return DomainExtractor.engine
         else:
-            return pydomainextractor.DomainExtractor(suffix_list_data)
+            return pydomainextractor.DomainExtractor(suffix_list_data, cache_size)
+
+    @staticmethod
+    def from_compiled(
+        compiled: bytes,
+        cache_size: int = 0,
+    ) -> pydomainextractor.DomainExtractor:
+        '''
+        Loads a suffix list previously serialized with DomainExtractor.to_compiled
+        '''
+        return pydomainextractor.DomainExtractor.from_compiled(compiled, cache_size)
+
+    @staticmethod
+    def from_compiled_file(
+        path: typing.Union[str, os.PathLike],
+        cache_size: int = 0,
+    ) -> pydomainextractor.DomainExtractor:
+        '''
+        Memory maps a file written from DomainExtractor.to_compiled. The mapping is read only
+        and shared between processes, so forked workers do not hold copies of the suffix list
+        '''
+        return pydomainextractor.DomainExtractor.from_compiled_file(path, cache_size)
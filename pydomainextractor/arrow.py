@@ -0,0 +1,61 @@
+import typing
+
+import pyarrow
+
+from . import DomainExtractor
+
+
+def extract_table(
+    domains: typing.Union[typing.Iterable[str], pyarrow.Array, pyarrow.ChunkedArray],
+    domain_extractor: typing.Optional[DomainExtractor] = None,
+    error_policy: str = 'raise',
+    num_threads: int = 1,
+    registered_domain: bool = False,
+) -> pyarrow.Table:
+    '''
+    Extracts the domains into a table of suffix, domain and subdomain large_string columns,
+    followed by a registered_domain column when asked to. Arrow string arrays are read in place
+    and the resulting columns wrap the buffers built by the extractor, so no per-domain Python
+    object is ever created.
+    '''
+    if domain_extractor is None:
+        domain_extractor = DomainExtractor()
+
+    if isinstance(domains, pyarrow.ChunkedArray):
+        domains = domains.combine_chunks()
+
+    if isinstance(domains, pyarrow.Array):
+        domains = domains.cast(pyarrow.large_string())
+        _, offsets, data = domains.buffers()
+        offsets = offsets.slice(domains.offset * 8, (len(domains) + 1) * 8)
+        validity = domains.is_valid().buffers()[1] if domains.null_count else None
+
+        columns = domain_extractor.extract_columns_from_arrow(
+            memoryview(offsets).cast('B'),
+            memoryview(data).cast('B') if data is not None else b'',
+            memoryview(validity).cast('B') if validity is not None else None,
+            error_policy=error_policy,
+            num_threads=num_threads,
+            registered_domain=registered_domain,
+        )
+    else:
+        columns = domain_extractor.extract_columns(
+            domains,
+            error_policy=error_policy,
+            num_threads=num_threads,
+            registered_domain=registered_domain,
+        )
+
+    arrays = {}
+    for column_name, (validity, offsets, data) in columns.items():
+        arrays[column_name] = pyarrow.Array.from_buffers(
+            pyarrow.large_string(),
+            len(offsets) // 8 - 1,
+            [
+                pyarrow.py_buffer(validity) if validity is not None else None,
+                pyarrow.py_buffer(offsets),
+                pyarrow.py_buffer(data),
+            ],
+        )
+
+    return pyarrow.table(arrays)
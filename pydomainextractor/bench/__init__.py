@@ -0,0 +1,186 @@
+import asyncio
+import datetime
+import fnmatch
+import hashlib
+import os
+import platform
+import subprocess
+import tempfile
+import typing
+
+from .. import DomainExtractor
+from .. import pydomainextractor
+from . import cases
+from . import corpus
+from . import measure
+
+
+def package_version() -> typing.Optional[str]:
+    try:
+        import importlib.metadata
+
+        return importlib.metadata.version('pydomainextractor')
+    except Exception:
+        return None
+
+
+def git_commit() -> typing.Optional[str]:
+    '''
+    The commit of the source tree the package is imported from, or None when the package is
+    installed, even inside another repository
+    '''
+    package_directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        toplevel, commit = subprocess.run(
+            ['git', 'rev-parse', '--show-toplevel', 'HEAD'],
+            cwd=package_directory,
+            capture_output=True,
+            check=True,
+            text=True,
+            timeout=10,
+        ).stdout.splitlines()
+        if not os.path.samefile(toplevel, os.path.dirname(package_directory)):
+            return None
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+
+    return commit
+
+
+def corpus_digest(
+    *corpora: typing.Iterable[str],
+) -> str:
+    digest = hashlib.sha256()
+    for items in corpora:
+        for item in items:
+            digest.update(item.encode('utf-8'))
+            digest.update(b'\n')
+
+    return digest.hexdigest()
+
+
+def run(
+    domain_extractor: typing.Optional[pydomainextractor.DomainExtractor] = None,
+    size: int = 100_000,
+    seed: int = 0,
+    repeat: int = 3,
+    batch_size: int = 10_000,
+    num_threads: typing.Sequence[int] = (1, 0),
+    patterns: typing.Optional[typing.Sequence[str]] = None,
+    progress: typing.Optional[typing.Callable[[typing.Dict[str, typing.Any]], None]] = None,
+) -> typing.Dict[str, typing.Any]:
+    '''
+    Benchmarks every method over corpora of size domains and size urls generated from seed, and
+    returns the results along with what is needed to tell whether two runs are comparable.
+    The batch methods run once per num_threads, and patterns keeps the benchmarks whose
+    names match any of them. progress is called with every result as soon as it is measured.
+    '''
+    if domain_extractor is None:
+        domain_extractor = DomainExtractor()
+    if size < 1 or repeat < 1 or batch_size < 1:
+        raise ValueError('size, repeat and batch_size must be positive')
+
+    corpus_generator = corpus.CorpusGenerator(domain_extractor.get_tld_list(), seed)
+    domains = corpus_generator.domains(size)
+    urls = corpus_generator.urls(size)
+
+    def selected(
+        benchmark: cases.Benchmark,
+    ) -> bool:
+        return patterns is None or any(fnmatch.fnmatchcase(benchmark.name, pattern) for pattern in patterns)
+
+    results = []
+    event_loop = asyncio.new_event_loop()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            benchmarks = [
+                *cases.setup_benchmarks(domain_extractor),
+                *cases.single_benchmarks(domain_extractor, domains, urls),
+            ]
+            for threads_count in num_threads:
+                benchmarks.extend(cases.batch_benchmarks(domain_extractor, domains, urls, batch_size, threads_count, event_loop))
+                benchmarks.extend(cases.file_benchmarks(domain_extractor, domains, directory, threads_count))
+
+            for benchmark in filter(selected, benchmarks):
+                # A first call outside of the measurement warms up the caches and the worker pools
+                try:
+                    benchmark.function(benchmark.inputs[0])
+                except ValueError:
+                    pass
+
+                result = measure.measure_calls(
+                    benchmark.name,
+                    benchmark.function,
+                    benchmark.inputs,
+                    repeat,
+                    benchmark.items_per_call,
+                    group=benchmark.group,
+                    num_threads=benchmark.num_threads,
+                )
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    finally:
+        event_loop.close()
+
+    return {
+        'metadata': {
+            'version': package_version(),
+            'commit': git_commit(),
+            'date': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count(),
+        },
+        'corpus': {
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'batch_size': batch_size,
+            'suffix_rules': len(corpus_generator.plain_rules) + len(corpus_generator.wildcard_rules) + len(corpus_generator.exception_rules),
+            'digest': corpus_digest(domains, urls),
+        },
+        'results': results,
+    }
+
+
+def compare(
+    baseline: typing.Dict[str, typing.Any],
+    current: typing.Dict[str, typing.Any],
+    threshold: float = 0.1,
+) -> typing.List[typing.Dict[str, typing.Any]]:
+    '''
+    Compares the throughput of the benchmarks both runs have in common. A benchmark regressed
+    when its throughput dropped by more than threshold, a fraction of the baseline throughput.
+    '''
+    if baseline['corpus']['digest'] != current['corpus']['digest']:
+        raise ValueError('the runs were made on different corpora, use the same size and seed')
+
+    baseline_results = {
+        (result['name'], result['num_threads']): result
+        for result in baseline['results']
+    }
+
+    comparisons = []
+    for result in current['results']:
+        baseline_result = baseline_results.get((result['name'], result['num_threads']))
+        if baseline_result is None or not baseline_result['throughput'] or not result['throughput']:
+            continue
+
+        change = result['throughput'] / baseline_result['throughput'] - 1
+        comparisons.append(
+            {
+                'name': result['name'],
+                'num_threads': result['num_threads'],
+                'baseline_throughput': baseline_result['throughput'],
+                'throughput': result['throughput'],
+                'change': change,
+                'baseline_p99_us': baseline_result['latency_us']['p99'],
+                'p99_us': result['latency_us']['p99'],
+                'regressed': change < -threshold,
+            }
+        )
+
+    return comparisons
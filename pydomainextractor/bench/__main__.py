@@ -0,0 +1,105 @@
+import argparse
+import json
+import sys
+import typing
+
+from . import compare
+from . import run
+
+
+def format_result(
+    result: typing.Dict[str, typing.Any],
+) -> str:
+    threads = '' if result['num_threads'] is None else f'threads={result["num_threads"]}'
+    throughput = f'{result["throughput"]:,.0f}/s' if result['throughput'] else '-'
+    latency = result['latency_us']
+
+    return f'{result["name"]:<40} {threads:<10} {throughput:>16} p50={latency["p50"]:.1f}us p99={latency["p99"]:.1f}us'
+
+
+def parse_arguments(
+    arguments: typing.Optional[typing.Sequence[str]],
+) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m pydomainextractor.bench',
+        description='Benchmarks pydomainextractor over deterministic synthetic corpora',
+    )
+    parser.add_argument('--size', type=int, default=100_000, help='number of domains and of urls to generate')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the corpora')
+    parser.add_argument('--repeat', type=int, default=3, help='number of passes over the corpora')
+    parser.add_argument('--batch-size', type=int, default=10_000, help='number of items per call of the batch methods')
+    parser.add_argument(
+        '--num-threads',
+        type=int,
+        nargs='+',
+        default=[1, 0],
+        help='num_threads values of the batch methods, 0 uses all the available cores',
+    )
+    parser.add_argument(
+        '--filter',
+        nargs='+',
+        default=None,
+        metavar='PATTERN',
+        help='only run the benchmarks whose names match one of the shell style patterns',
+    )
+    parser.add_argument('--output', default=None, help='path of the JSON results, printed to stdout otherwise')
+    parser.add_argument('--compare', default=None, metavar='BASELINE', help='JSON results of a previous run to compare with')
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.1,
+        help='throughput drop, as a fraction of the baseline, over which a benchmark has regressed',
+    )
+
+    return parser.parse_args(arguments)
+
+
+def main(
+    arguments: typing.Optional[typing.Sequence[str]] = None,
+) -> int:
+    '''
+    Runs the benchmarks, writes their results and returns 1 when any of them regressed
+    compared with the baseline, 0 otherwise
+    '''
+    arguments = parse_arguments(arguments)
+
+    baseline = None
+    if arguments.compare is not None:
+        with open(arguments.compare, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results = run(
+        size=arguments.size,
+        seed=arguments.seed,
+        repeat=arguments.repeat,
+        batch_size=arguments.batch_size,
+        num_threads=arguments.num_threads,
+        patterns=arguments.filter,
+        progress=lambda result: print(format_result(result), file=sys.stderr, flush=True),
+    )
+
+    if arguments.output is None:
+        json.dump(results, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(arguments.output, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+    if baseline is None:
+        return 0
+
+    comparisons = compare(baseline, results, arguments.threshold)
+    print(file=sys.stderr)
+    for comparison in comparisons:
+        threads = '' if comparison['num_threads'] is None else f'threads={comparison["num_threads"]}'
+        status = 'REGRESSED' if comparison['regressed'] else ''
+        print(
+            f'{comparison["name"]:<40} {threads:<10} {comparison["change"]:>+8.1%} {status}',
+            file=sys.stderr,
+        )
+
+    return 1 if any(comparison['regressed'] for comparison in comparisons) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
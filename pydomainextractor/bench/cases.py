@@ -0,0 +1,321 @@
+import array
+import asyncio
+import os
+import typing
+
+from .. import pydomainextractor
+from . import corpus
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+
+class Benchmark(typing.NamedTuple):
+    name: str
+    group: str
+    function: typing.Callable[[typing.Any], typing.Any]
+    inputs: typing.Sequence[typing.Any]
+    items_per_call: typing.Union[int, typing.Callable[[typing.Any], int]] = 1
+    num_threads: typing.Optional[int] = None
+
+
+def split_batches(
+    items: typing.Sequence[typing.Any],
+    batch_size: int,
+) -> typing.List[typing.Sequence[typing.Any]]:
+    return [items[index:index + batch_size] for index in range(0, len(items), batch_size)]
+
+
+def split_wire_names(
+    domains: typing.Iterable[str],
+) -> typing.List[bytes]:
+    message, offsets = corpus.encode_wire_names(domains)
+
+    return [
+        message[start:end]
+        for start, end in zip(offsets, offsets[1:] + [len(message)])
+    ]
+
+
+def watchlist(
+    domain_extractor: pydomainextractor.DomainExtractor,
+    domains: typing.Sequence[str],
+) -> typing.List[str]:
+    '''
+    The registered domains of every tenth domain, so hosts match exactly, by parent domain,
+    by registered domain, or not at all
+    '''
+    registered_domains = domain_extractor.registered_domain_many(domains[::10], error_policy='skip')
+
+    return [registered_domain for registered_domain in registered_domains if registered_domain]
+
+
+def setup_benchmarks(
+    domain_extractor: pydomainextractor.DomainExtractor,
+) -> typing.Iterator[Benchmark]:
+    '''
+    Loading and serializing the suffix list, one call per repetition
+    '''
+    compiled = domain_extractor.to_compiled()
+
+    yield Benchmark('DomainExtractor', 'setup', lambda _: pydomainextractor.DomainExtractor(), [None])
+    yield Benchmark('from_compiled', 'setup', pydomainextractor.DomainExtractor.from_compiled, [compiled])
+    yield Benchmark('to_compiled', 'setup', lambda _: domain_extractor.to_compiled(), [None])
+    yield Benchmark('get_tld_list', 'setup', lambda _: domain_extractor.get_tld_list(), [None])
+
+
+def single_benchmarks(
+    domain_extractor: pydomainextractor.DomainExtractor,
+    domains: typing.List[str],
+    urls: typing.List[str],
+) -> typing.Iterator[Benchmark]:
+    '''
+    One call per domain or url
+    '''
+    yield Benchmark('extract', 'single', domain_extractor.extract, domains)
+    yield Benchmark(
+        'extract[compact]',
+        'single',
+        lambda domain: domain_extractor.extract(domain, compact=True),
+        domains,
+    )
+    yield Benchmark(
+        'extract[bytes]',
+        'single',
+        lambda domain: domain_extractor.extract(domain, return_bytes=True),
+        [domain.encode('utf-8') for domain in domains],
+    )
+    yield Benchmark(
+        'extract[unicode]',
+        'single',
+        lambda domain: domain_extractor.extract(domain, output_form='unicode'),
+        domains,
+    )
+    yield Benchmark(
+        'extract[icann]',
+        'single',
+        lambda domain: domain_extractor.extract(domain, include_private=False),
+        domains,
+    )
+
+    # Every domain is extracted once beforehand, so every call hits the cache
+    cached_domain_extractor = pydomainextractor.DomainExtractor(cache_size=len(domains))
+    for domain in domains:
+        try:
+            cached_domain_extractor.extract(domain)
+        except ValueError:
+            pass
+    yield Benchmark('extract[cached]', 'single', cached_domain_extractor.extract, domains)
+
+    yield Benchmark('extract_from_url', 'single', domain_extractor.extract_from_url, urls)
+    yield Benchmark('extract_url_parts', 'single', domain_extractor.extract_url_parts, urls)
+    yield Benchmark('extract_spans', 'single', domain_extractor.extract_spans, domains)
+    yield Benchmark('registered_domain', 'single', domain_extractor.registered_domain, domains)
+    yield Benchmark('public_suffix', 'single', domain_extractor.public_suffix, domains)
+    yield Benchmark('is_valid_domain', 'single', domain_extractor.is_valid_domain, domains)
+    yield Benchmark('validate_domain', 'single', domain_extractor.validate_domain, domains)
+    yield Benchmark('extract_wire_name', 'single', domain_extractor.extract_wire_name, split_wire_names(domains))
+
+    domain_matcher = pydomainextractor.DomainMatcher(watchlist(domain_extractor, domains), domain_extractor)
+    yield Benchmark('DomainMatcher.match_domain', 'single', domain_matcher.match_domain, domains)
+
+
+def batch_benchmarks(
+    domain_extractor: pydomainextractor.DomainExtractor,
+    domains: typing.List[str],
+    urls: typing.List[str],
+    batch_size: int,
+    num_threads: int,
+    event_loop: asyncio.AbstractEventLoop,
+) -> typing.Iterator[Benchmark]:
+    '''
+    One call per batch of batch_size domains or urls. Invalid entries are turned into None,
+    as they would stop the batch otherwise.
+    '''
+    domains_batches = split_batches(domains, batch_size)
+    urls_batches = split_batches(urls, batch_size)
+
+    def batch(
+        name: str,
+        function: typing.Callable[[typing.Any], typing.Any],
+        batches: typing.Sequence[typing.Any],
+        items_per_call: typing.Union[int, typing.Callable[[typing.Any], int]] = len,
+    ) -> Benchmark:
+        return Benchmark(name, 'batch', function, batches, items_per_call, num_threads)
+
+    yield batch(
+        'extract_many',
+        lambda domains: domain_extractor.extract_many(domains, error_policy='none', num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'extract_many[compact]',
+        lambda domains: domain_extractor.extract_many(domains, error_policy='none', num_threads=num_threads, compact=True),
+        domains_batches,
+    )
+    yield batch(
+        'extract_from_url_many',
+        lambda urls: domain_extractor.extract_from_url_many(urls, error_policy='none', num_threads=num_threads),
+        urls_batches,
+    )
+    yield batch(
+        'extract_url_parts_many',
+        lambda urls: domain_extractor.extract_url_parts_many(urls, error_policy='none', num_threads=num_threads),
+        urls_batches,
+    )
+
+    spans = array.array('i', bytes(4 * 4 * batch_size))
+    yield batch(
+        'extract_spans_many',
+        lambda domains: domain_extractor.extract_spans_many(domains, spans, num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'registered_domain_many',
+        lambda domains: domain_extractor.registered_domain_many(domains, error_policy='none', num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'public_suffix_many',
+        lambda domains: domain_extractor.public_suffix_many(domains, error_policy='none', num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'is_valid_domain_many',
+        lambda domains: domain_extractor.is_valid_domain_many(domains, num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'validate_many',
+        lambda domains: domain_extractor.validate_many(domains, num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'validate_many[reasons]',
+        lambda domains: domain_extractor.validate_many(domains, num_threads=num_threads, reasons=True),
+        domains_batches,
+    )
+    yield batch(
+        'extract_columns',
+        lambda domains: domain_extractor.extract_columns(domains, error_policy='none', num_threads=num_threads),
+        domains_batches,
+    )
+    yield batch(
+        'extract_columns[registered_domain]',
+        lambda domains: domain_extractor.extract_columns(
+            domains,
+            error_policy='none',
+            num_threads=num_threads,
+            registered_domain=True,
+        ),
+        domains_batches,
+    )
+
+    buffers = [
+        b'\n'.join(domain.encode('utf-8') for domain in domains_batch)
+        for domains_batch in domains_batches
+    ]
+    yield batch(
+        'extract_buffer',
+        lambda buffer: domain_extractor.extract_buffer(buffer, error_policy='none', num_threads=num_threads),
+        buffers,
+        lambda buffer: buffer.count(b'\n') + 1,
+    )
+
+    wire_messages = [corpus.encode_wire_names(domains_batch) for domains_batch in domains_batches]
+    yield batch(
+        'extract_wire_names',
+        lambda message: domain_extractor.extract_wire_names(
+            message[0],
+            offsets=message[1],
+            error_policy='none',
+            num_threads=num_threads,
+        ),
+        wire_messages,
+        lambda message: len(message[1]),
+    )
+
+    domain_matcher = pydomainextractor.DomainMatcher(watchlist(domain_extractor, domains), domain_extractor)
+    yield batch(
+        'DomainMatcher.match_many',
+        lambda hosts: domain_matcher.match_many(hosts, num_threads=num_threads),
+        domains_batches,
+    )
+
+    async def extract_many_async(
+        domains: typing.Sequence[str],
+    ) -> typing.List[typing.Any]:
+        return await domain_extractor.extract_many_async(domains, error_policy='none', num_threads=num_threads)
+
+    async def extract_from_url_many_async(
+        urls: typing.Sequence[str],
+    ) -> typing.List[typing.Any]:
+        return await domain_extractor.extract_from_url_many_async(urls, error_policy='none', num_threads=num_threads)
+
+    yield batch(
+        'extract_many_async',
+        lambda domains: event_loop.run_until_complete(extract_many_async(domains)),
+        domains_batches,
+    )
+    yield batch(
+        'extract_from_url_many_async',
+        lambda urls: event_loop.run_until_complete(extract_from_url_many_async(urls)),
+        urls_batches,
+    )
+
+    # Every registered domain of the watchlist is a lookalike target, the count is the number
+    # of targets as the number of candidates varies from one to the other
+    targets = watchlist(domain_extractor, domains)[:16]
+    yield batch(
+        'lookalikes',
+        lambda domain: sum(len(lookalikes) for lookalikes in domain_extractor.lookalikes(domain, num_threads=num_threads)),
+        targets,
+        1,
+    )
+
+    if pyarrow is not None:
+        from .. import arrow
+
+        arrays = [pyarrow.array(domains_batch, pyarrow.large_string()) for domains_batch in domains_batches]
+        yield batch(
+            'arrow.extract_table',
+            lambda domains: arrow.extract_table(domains, domain_extractor, error_policy='none', num_threads=num_threads),
+            arrays,
+        )
+
+
+def file_benchmarks(
+    domain_extractor: pydomainextractor.DomainExtractor,
+    domains: typing.List[str],
+    directory: str,
+    num_threads: int,
+) -> typing.Iterator[Benchmark]:
+    '''
+    One call per file holding the whole domains corpus, a domain per line
+    '''
+    path = os.path.join(directory, 'domains.txt')
+    if not os.path.exists(path):
+        with open(path, 'w', encoding='utf-8') as domains_file:
+            domains_file.write('\n'.join(domains))
+            domains_file.write('\n')
+
+    output_path = os.path.join(directory, 'domains.tsv')
+
+    yield Benchmark(
+        'iter_file',
+        'file',
+        lambda path: sum(len(chunk) for chunk in domain_extractor.iter_file(path, error_policy='none', num_threads=num_threads)),
+        [path],
+        len(domains),
+        num_threads,
+    )
+    yield Benchmark(
+        'extract_file',
+        'file',
+        lambda path: domain_extractor.extract_file(path, output_path, error_policy='none', num_threads=num_threads),
+        [path],
+        len(domains),
+        num_threads,
+    )
@@ -0,0 +1,245 @@
+import random
+import string
+import typing
+
+
+LABEL_CHARACTERS = string.ascii_lowercase + string.digits
+COMMON_SUFFIXES = (
+    ('com', 40),
+    ('net', 8),
+    ('org', 8),
+    ('de', 4),
+    ('co.uk', 4),
+    ('ru', 3),
+    ('io', 3),
+    ('com.br', 2),
+    ('co.jp', 2),
+    ('github.io', 2),
+    ('s3.amazonaws.com', 1),
+    ('blogspot.com', 1),
+)
+SUBDOMAIN_LABELS = (
+    'www', 'mail', 'api', 'cdn', 'static', 'dev', 'staging', 'm', 'login', 'img',
+    'us-east-1', 'eu-west-2', 'edge', 'assets', 'auth', 'admin', 'shop', 'blog',
+)
+UNICODE_ALPHABETS = (
+    'абвгдежзиклмнопрстуфхцчшщэюя',
+    'αβγδεζηθικλμνξοπρστυφχψω',
+    'äöüßéèêàçñøå',
+    '中国网络公司北京上海广州深圳科技',
+    'ابتثجحخدذرزسشصضطظعغفقكلمنهوي',
+)
+UNICODE_SUFFIXES = (
+    '中国',
+    'рф',
+    'δοκιμή',
+    'みんな',
+    'السعودية',
+)
+URL_SCHEMES = (
+    ('https', 70),
+    ('http', 25),
+    ('ftp', 3),
+    ('wss', 2),
+)
+
+
+class CorpusGenerator:
+    '''
+    Generates domains and urls from a seeded random generator, so the same seed and suffix list
+    always give the same corpus. The suffixes are drawn from a weighted list of common ones with
+    a long tail of every rule of the suffix list, wildcard and exception rules included.
+    '''
+    def __init__(
+        self,
+        suffix_rules: typing.Iterable[str],
+        seed: int = 0,
+    ) -> None:
+        self.random = random.Random(seed)
+
+        suffix_rules = sorted(suffix_rules)
+        self.plain_rules = [rule for rule in suffix_rules if not rule.startswith(('*', '!'))]
+        self.wildcard_rules = [rule[2:] for rule in suffix_rules if rule.startswith('*.')]
+        self.exception_rules = [rule[1:] for rule in suffix_rules if rule.startswith('!')]
+
+        self.common_suffixes = [suffix for suffix, _ in COMMON_SUFFIXES]
+        self.common_suffixes_weights = [weight for _, weight in COMMON_SUFFIXES]
+
+    def label(
+        self,
+        min_length: int = 3,
+        max_length: int = 16,
+    ) -> str:
+        length = self.random.randint(min_length, max_length)
+        label = ''.join(self.random.choices(LABEL_CHARACTERS, k=length))
+        if length > 4 and self.random.random() < 0.1:
+            hyphen_index = self.random.randint(1, length - 2)
+            label = label[:hyphen_index] + '-' + label[hyphen_index + 1:]
+
+        return label
+
+    def unicode_label(
+        self,
+    ) -> str:
+        alphabet = self.random.choice(UNICODE_ALPHABETS)
+
+        return ''.join(self.random.choices(alphabet, k=self.random.randint(2, 10)))
+
+    def subdomain(
+        self,
+        min_depth: int,
+        max_depth: int,
+    ) -> typing.List[str]:
+        return [
+            self.random.choice(SUBDOMAIN_LABELS) if self.random.random() < 0.5 else self.label(1, 12)
+            for _ in range(self.random.randint(min_depth, max_depth))
+        ]
+
+    def domain(
+        self,
+    ) -> str:
+        '''
+        A single domain out of a mix that roughly follows what passive DNS and crawls look like:
+        mostly registered domains of common suffixes with a subdomain or two, and a tail of deep
+        subdomains, wildcard and exception rules, internationalized labels, mixed case, suffixes
+        alone, unknown suffixes and invalid domains
+        '''
+        kind = self.random.random()
+        if kind < 0.55:
+            suffix = self.random.choices(self.common_suffixes, self.common_suffixes_weights)[0]
+            labels = self.subdomain(0, 2) + [self.label(), suffix]
+        elif kind < 0.70:
+            labels = self.subdomain(0, 2) + [self.label(), self.random.choice(self.plain_rules)]
+        elif kind < 0.78:
+            suffix = self.random.choices(self.common_suffixes, self.common_suffixes_weights)[0]
+            labels = self.subdomain(4, 12) + [self.label(), suffix]
+        elif kind < 0.83 and self.wildcard_rules:
+            labels = self.subdomain(0, 2) + [self.label(), self.label(2, 8), self.random.choice(self.wildcard_rules)]
+        elif kind < 0.86 and self.exception_rules:
+            labels = self.subdomain(0, 2) + [self.random.choice(self.exception_rules)]
+        elif kind < 0.91:
+            labels = self.subdomain(0, 1) + [self.unicode_label(), self.random.choice(UNICODE_SUFFIXES)]
+        elif kind < 0.94:
+            label = 'xn--' + self.unicode_label().encode('punycode').decode('ascii')
+            labels = self.subdomain(0, 1) + [label, self.random.choice(self.common_suffixes)]
+        elif kind < 0.96:
+            labels = [self.label().upper(), self.random.choice(self.common_suffixes).upper()]
+        elif kind < 0.97:
+            labels = [self.random.choice(self.plain_rules)]
+        elif kind < 0.98:
+            labels = self.subdomain(0, 1) + [self.label(), self.label(5, 10)]
+        else:
+            return self.invalid_domain()
+
+        return '.'.join(labels)
+
+    def invalid_domain(
+        self,
+    ) -> str:
+        suffix = self.random.choice(self.common_suffixes)
+        kind = self.random.randrange(5)
+        if kind == 0:
+            return f'{self.label()}..{suffix}'
+        elif kind == 1:
+            return f'{self.label(64, 70)}.{suffix}'
+        elif kind == 2:
+            return f'-{self.label()}.{suffix}'
+        elif kind == 3:
+            return f'{self.label()}_{self.label()}.{suffix}'
+        else:
+            return f'.{suffix}'
+
+    def url(
+        self,
+        domain: typing.Optional[str] = None,
+    ) -> str:
+        '''
+        A url of the domain, or of a fresh one, with the components crawlers meet: userinfo, ports,
+        IP hosts, deep paths, long queries and fragments
+        '''
+        scheme = self.random.choices([scheme for scheme, _ in URL_SCHEMES], [weight for _, weight in URL_SCHEMES])[0]
+
+        host_kind = self.random.random()
+        if host_kind < 0.03:
+            host = '.'.join(str(self.random.randrange(256)) for _ in range(4))
+        elif host_kind < 0.04:
+            host = '[2001:db8::' + format(self.random.randrange(65536), 'x') + ']'
+        else:
+            host = domain if domain is not None else self.domain()
+
+        url = f'{scheme}://'
+        if self.random.random() < 0.03:
+            url += f'{self.label()}:{self.label()}@'
+        url += host
+        if self.random.random() < 0.1:
+            url += f':{self.random.randint(1, 65535)}'
+
+        path_depth = self.random.choices(range(8), [10, 25, 25, 15, 10, 5, 5, 5])[0]
+        if self.random.random() < 0.02:
+            path_depth = self.random.randint(40, 120)
+        url += ''.join(f'/{self.label(1, 20)}' for _ in range(path_depth))
+
+        if self.random.random() < 0.3:
+            parameters_count = self.random.randint(1, 6)
+            if self.random.random() < 0.05:
+                parameters_count = self.random.randint(30, 80)
+            url += '?' + '&'.join(
+                f'{self.label(1, 10)}={self.label(0, 40)}'
+                for _ in range(parameters_count)
+            )
+        if self.random.random() < 0.05:
+            url += f'#{self.label()}'
+
+        return url
+
+    def domains(
+        self,
+        size: int,
+    ) -> typing.List[str]:
+        return [self.domain() for _ in range(size)]
+
+    def urls(
+        self,
+        size: int,
+    ) -> typing.List[str]:
+        return [self.url() for _ in range(size)]
+
+
+def generate_domains(
+    suffix_rules: typing.Iterable[str],
+    size: int,
+    seed: int = 0,
+) -> typing.List[str]:
+    return CorpusGenerator(suffix_rules, seed).domains(size)
+
+
+def generate_urls(
+    suffix_rules: typing.Iterable[str],
+    size: int,
+    seed: int = 0,
+) -> typing.List[str]:
+    return CorpusGenerator(suffix_rules, seed).urls(size)
+
+
+def encode_wire_names(
+    domains: typing.Iterable[str],
+) -> typing.Tuple[bytes, typing.List[int]]:
+    '''
+    Encodes the domains as uncompressed DNS wire format names, one after the other.
+    Domains that can not be encoded, such as ones with empty or overlong labels, are left out.
+    '''
+    message = bytearray()
+    offsets = []
+    for domain in domains:
+        labels = [label.encode('utf-8') for label in domain.split('.')]
+        if any(not 0 < len(label) < 64 for label in labels):
+            continue
+
+        name = b''.join(bytes([len(label)]) + label for label in labels) + b'\x00'
+        if len(name) > 255:
+            continue
+
+        offsets.append(len(message))
+        message += name
+
+    return bytes(message), offsets
@@ -0,0 +1,117 @@
+import math
+import sys
+import time
+import typing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def peak_rss() -> typing.Optional[int]:
+    '''
+    The peak resident set size of the process so far in bytes, or None where it is not available
+    '''
+    if resource is None:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        return max_rss
+
+    return max_rss * 1024
+
+
+def percentile(
+    sorted_samples: typing.Sequence[float],
+    rank: float,
+) -> float:
+    '''
+    The nearest rank percentile of already sorted samples
+    '''
+    index = max(math.ceil(rank / 100 * len(sorted_samples)) - 1, 0)
+
+    return sorted_samples[index]
+
+
+def summarize(
+    name: str,
+    samples_ns: typing.List[int],
+    items_count: int,
+    rss_before: typing.Optional[int],
+    rss_after: typing.Optional[int],
+    **parameters: typing.Any,
+) -> typing.Dict[str, typing.Any]:
+    '''
+    Turns the latency samples of a benchmark into its result. Throughput is the number of items
+    over the time spent in all the samples, latencies are in microseconds.
+    '''
+    samples_ns = sorted(samples_ns)
+    total_seconds = sum(samples_ns) / 1e9
+
+    latency = {
+        f'p{rank:g}': percentile(samples_ns, rank) / 1e3
+        for rank in PERCENTILES
+    }
+    latency['min'] = samples_ns[0] / 1e3
+    latency['max'] = samples_ns[-1] / 1e3
+    latency['mean'] = total_seconds * 1e6 / len(samples_ns)
+
+    return {
+        'name': name,
+        **parameters,
+        'items': items_count,
+        'samples': len(samples_ns),
+        'seconds': total_seconds,
+        'throughput': items_count / total_seconds if total_seconds else None,
+        'latency_us': latency,
+        'peak_rss': rss_after,
+        'peak_rss_growth': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+    }
+
+
+def measure_calls(
+    name: str,
+    function: typing.Callable[[typing.Any], typing.Any],
+    inputs: typing.Sequence[typing.Any],
+    repeat: int,
+    items_per_call: typing.Union[int, typing.Callable[[typing.Any], int]] = 1,
+    catch: typing.Tuple[typing.Type[BaseException], ...] = (ValueError,),
+    **parameters: typing.Any,
+) -> typing.Dict[str, typing.Any]:
+    '''
+    Calls function on every input, repeat times, and times every call on its own.
+    Calls raising one of catch are timed as well, invalid inputs are part of the corpora.
+    '''
+    perf_counter_ns = time.perf_counter_ns
+    samples_ns = []
+    rss_before = peak_rss()
+
+    for _ in range(repeat):
+        for function_input in inputs:
+            start = perf_counter_ns()
+            try:
+                function(function_input)
+            except catch:
+                pass
+            samples_ns.append(perf_counter_ns() - start)
+
+    rss_after = peak_rss()
+
+    if callable(items_per_call):
+        items_count = sum(items_per_call(function_input) for function_input in inputs) * repeat
+    else:
+        items_count = len(inputs) * items_per_call * repeat
+
+    return summarize(
+        name,
+        samples_ns,
+        items_count,
+        rss_before,
+        rss_after,
+        **parameters,
+    )
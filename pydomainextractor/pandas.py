@@ -0,0 +1,50 @@
+import typing
+
+import pandas
+import pyarrow
+
+from . import DomainExtractor
+from . import arrow
+
+
+@pandas.api.extensions.register_series_accessor('domain')
+class DomainAccessor:
+    '''
+    The .domain accessor of string Series, registered once this module is imported
+    '''
+    def __init__(
+        self,
+        series: pandas.Series,
+    ) -> None:
+        self._series = series
+
+    def extract(
+        self,
+        domain_extractor: typing.Optional[DomainExtractor] = None,
+        error_policy: str = 'raise',
+        num_threads: int = 0,
+    ) -> pandas.DataFrame:
+        '''
+        Extracts the whole Series at once into a DataFrame of suffix, domain, subdomain and
+        registered_domain columns, sharing the index of the Series. The Series goes through
+        the Arrow columnar path, and by default uses all the available cores.
+        Missing values, and invalid domains with error_policy='none', are missing in every column.
+        '''
+        if error_policy == 'skip':
+            raise ValueError('error_policy=\'skip\' would misalign the result with the index')
+
+        table = arrow.extract_table(
+            pyarrow.Array.from_pandas(self._series),
+            domain_extractor=domain_extractor,
+            error_policy=error_policy,
+            num_threads=num_threads,
+            registered_domain=True,
+        )
+
+        if isinstance(self._series.dtype, getattr(pandas, 'ArrowDtype', ())):
+            data_frame = table.to_pandas(types_mapper=pandas.ArrowDtype)
+        else:
+            data_frame = table.to_pandas()
+        data_frame.index = self._series.index
+
+        return data_frame
@@ -0,0 +1,100 @@
+import typing
+
+import polars
+
+from . import DomainExtractor
+from . import arrow
+
+EXTRACTION_DTYPE = polars.Struct(
+    {
+        'suffix': polars.Utf8,
+        'domain': polars.Utf8,
+        'subdomain': polars.Utf8,
+        'registered_domain': polars.Utf8,
+    }
+)
+
+
+def extract_series(
+    series: polars.Series,
+    domain_extractor: typing.Optional[DomainExtractor] = None,
+    error_policy: str = 'raise',
+    num_threads: int = 0,
+) -> polars.Series:
+    '''
+    Extracts the whole Series at once into a Series of suffix, domain, subdomain and
+    registered_domain structs. The Series goes through the Arrow columnar path, and by
+    default uses all the available cores.
+    '''
+    if error_policy == 'skip':
+        raise ValueError('error_policy=\'skip\' would misalign the result with the input')
+
+    table = arrow.extract_table(
+        series.to_arrow(),
+        domain_extractor=domain_extractor,
+        error_policy=error_policy,
+        num_threads=num_threads,
+        registered_domain=True,
+    )
+
+    return polars.from_arrow(table).to_struct(series.name)
+
+
+@polars.api.register_expr_namespace('domain')
+class DomainExpressions:
+    '''
+    The .domain namespace of expressions, registered once this module is imported
+    '''
+    def __init__(
+        self,
+        expr: polars.Expr,
+    ) -> None:
+        self._expr = expr
+
+    def extract(
+        self,
+        domain_extractor: typing.Optional[DomainExtractor] = None,
+        error_policy: str = 'raise',
+        num_threads: int = 0,
+    ) -> polars.Expr:
+        '''
+        An expression of the struct of parts of every domain, use .struct.unnest() for columns.
+        The whole column is handed to the extractor in a single call.
+        '''
+        return self._expr.map_batches(
+            lambda series: extract_series(
+                series,
+                domain_extractor=domain_extractor,
+                error_policy=error_policy,
+                num_threads=num_threads,
+            ),
+            return_dtype=EXTRACTION_DTYPE,
+        )
+
+
+@polars.api.register_series_namespace('domain')
+class DomainSeries:
+    '''
+    The .domain namespace of Series, registered once this module is imported
+    '''
+    def __init__(
+        self,
+        series: polars.Series,
+    ) -> None:
+        self._series = series
+
+    def extract(
+        self,
+        domain_extractor: typing.Optional[DomainExtractor] = None,
+        error_policy: str = 'raise',
+        num_threads: int = 0,
+    ) -> polars.DataFrame:
+        '''
+        Extracts the Series into a DataFrame of suffix, domain, subdomain and registered_domain columns
+        '''
+        return extract_series(
+            self._series,
+            domain_extractor=domain_extractor,
+            error_policy=error_policy,
+            num_threads=num_threads,
+        ).struct.unnest()
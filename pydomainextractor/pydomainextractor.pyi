@@ -1,27 +1,397 @@
+import asyncio
+import os
 import typing
 
+DomainInput = typing.Union[str, bytes, bytearray, memoryview]
+HostType = typing.Literal['domain', 'ipv4', 'ipv6']
+
+
+class ExtractResult:
+    suffix: str
+    domain: str
+    subdomain: str
+    is_private: bool
+    host_type: HostType
+
+    def __init__(
+        self,
+        suffix: str,
+        domain: str,
+        subdomain: str,
+        is_private: bool = False,
+        host_type: HostType = 'domain',
+    ) -> None: ...
+
+    def as_dict(
+        self,
+    ) -> typing.Dict[str, str]: ...
+
+    def __len__(
+        self,
+    ) -> int: ...
+
+    def __getitem__(
+        self,
+        index: int,
+    ) -> str: ...
+
+    def __iter__(
+        self,
+    ) -> typing.Iterator[str]: ...
+
+    def __hash__(
+        self,
+    ) -> int: ...
+
 
 class DomainExtractor:
     def __init__(
         self,
         suffix_list_data: typing.Optional[str] = None,
+        cache_size: int = 0,
     ) -> None: ...
 
+    @typing.overload
     def extract(
         self,
-        domain: str,
+        domain: DomainInput,
+        compact: typing.Literal[False] = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        return_bytes: typing.Literal[False] = False,
     ) -> typing.Dict[str, str]: ...
 
+    @typing.overload
+    def extract(
+        self,
+        domain: DomainInput,
+        compact: typing.Literal[True],
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        return_bytes: typing.Literal[False] = False,
+    ) -> ExtractResult: ...
+
+    @typing.overload
+    def extract(
+        self,
+        domain: DomainInput,
+        compact: typing.Literal[False] = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        *,
+        return_bytes: typing.Literal[True],
+    ) -> typing.Dict[str, bytes]: ...
+
+    def extract_many(
+        self,
+        domains: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+    ) -> typing.List[typing.Optional[typing.Union[typing.Dict[str, str], ExtractResult]]]: ...
+
+    def extract_many_async(
+        self,
+        domains: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+    ) -> asyncio.Future[typing.List[typing.Optional[typing.Union[typing.Dict[str, str], ExtractResult]]]]: ...
+
+    @typing.overload
     def extract_from_url(
         self,
-        url: str,
+        url: DomainInput,
+        compact: typing.Literal[False] = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        return_bytes: typing.Literal[False] = False,
     ) -> typing.Dict[str, str]: ...
 
-    def is_valid_domain(
+    @typing.overload
+    def extract_from_url(
+        self,
+        url: DomainInput,
+        compact: typing.Literal[True],
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        return_bytes: typing.Literal[False] = False,
+    ) -> ExtractResult: ...
+
+    @typing.overload
+    def extract_from_url(
+        self,
+        url: DomainInput,
+        compact: typing.Literal[False] = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+        *,
+        return_bytes: typing.Literal[True],
+    ) -> typing.Dict[str, bytes]: ...
+
+    def extract_from_url_many(
+        self,
+        urls: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+    ) -> typing.List[typing.Optional[typing.Union[typing.Dict[str, str], ExtractResult]]]: ...
+
+    def extract_from_url_many_async(
+        self,
+        urls: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        output_form: typing.Literal['as_is', 'ascii', 'unicode'] = 'as_is',
+        include_private: bool = True,
+    ) -> asyncio.Future[typing.List[typing.Optional[typing.Union[typing.Dict[str, str], ExtractResult]]]]: ...
+
+    def extract_url_parts(
+        self,
+        url: str,
+    ) -> typing.Dict[str, typing.Union[str, int, bool, None]]: ...
+
+    def extract_url_parts_many(
+        self,
+        urls: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+    ) -> typing.List[typing.Optional[typing.Dict[str, typing.Union[str, int, bool, None]]]]: ...
+
+    def extract_spans(
         self,
         domain: str,
+    ) -> typing.Tuple[int, int, int, int]: ...
+
+    def extract_spans_many(
+        self,
+        domains: typing.Iterable[str],
+        out: typing.Any,
+        num_threads: int = 1,
+    ) -> int: ...
+
+    def registered_domain(
+        self,
+        domain: str,
+    ) -> str: ...
+
+    def registered_domain_many(
+        self,
+        domains: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+    ) -> typing.List[typing.Optional[str]]: ...
+
+    def public_suffix(
+        self,
+        domain: str,
+    ) -> str: ...
+
+    def public_suffix_many(
+        self,
+        domains: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+    ) -> typing.List[typing.Optional[str]]: ...
+
+    def extract_columns(
+        self,
+        domains: typing.Iterable[str],
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        registered_domain: bool = False,
+    ) -> typing.Dict[str, typing.Tuple[typing.Optional[bytes], bytes, bytes]]: ...
+
+    def extract_columns_from_arrow(
+        self,
+        offsets: typing.Any,
+        data: typing.Any,
+        validity: typing.Optional[typing.Any] = None,
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        registered_domain: bool = False,
+    ) -> typing.Dict[str, typing.Tuple[typing.Optional[bytes], bytes, bytes]]: ...
+
+    def extract_buffer(
+        self,
+        buffer: typing.Any,
+        separator: bytes = b'\n',
+        offsets: typing.Optional[typing.Any] = None,
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        return_bytes: bool = False,
+    ) -> typing.List[typing.Any]: ...
+
+    def extract_wire_name(
+        self,
+        message: typing.Any,
+        offset: int = 0,
+        compact: bool = False,
+        return_bytes: bool = False,
+    ) -> typing.Any: ...
+
+    def extract_wire_names(
+        self,
+        message: typing.Any,
+        offsets: typing.Optional[typing.Sequence[int]] = None,
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+        return_bytes: bool = False,
+    ) -> typing.List[typing.Any]: ...
+
+    def is_valid_domain(
+        self,
+        domain: DomainInput,
     ) -> bool: ...
 
+    def is_valid_domain_many(
+        self,
+        domains: typing.Iterable[str],
+        num_threads: int = 1,
+    ) -> typing.List[bool]: ...
+
+    def validate_domain(
+        self,
+        domain: str,
+    ) -> typing.Optional[typing.Literal[
+        'invalid_length',
+        'invalid_label_length',
+        'invalid_hyphen',
+        'invalid_character',
+        'not_registrable',
+        'invalid_idna',
+    ]]: ...
+
+    @typing.overload
+    def validate_many(
+        self,
+        domains: typing.Iterable[str],
+        num_threads: int = 1,
+        reasons: typing.Literal[False] = False,
+    ) -> bytes: ...
+
+    @typing.overload
+    def validate_many(
+        self,
+        domains: typing.Iterable[str],
+        num_threads: int = 1,
+        *,
+        reasons: typing.Literal[True],
+    ) -> typing.List[typing.Optional[str]]: ...
+
+    def lookalikes(
+        self,
+        domain: str,
+        kinds: typing.Optional[typing.Iterable[typing.Literal['omission', 'transposition', 'homoglyph', 'bit_flip', 'tld_swap']]] = None,
+        batch_size: int = 65536,
+        num_threads: int = 1,
+    ) -> LookalikeIterator: ...
+
     def get_tld_list(
         self,
     ) -> typing.List[str]: ...
+
+    @staticmethod
+    def from_compiled(
+        compiled: bytes,
+        cache_size: int = 0,
+    ) -> DomainExtractor: ...
+
+    @staticmethod
+    def from_compiled_file(
+        path: typing.Union[str, os.PathLike],
+        cache_size: int = 0,
+    ) -> DomainExtractor: ...
+
+    def to_compiled(
+        self,
+    ) -> bytes: ...
+
+    def cache_info(
+        self,
+    ) -> typing.Dict[str, int]: ...
+
+    def cache_clear(
+        self,
+    ) -> None: ...
+
+    def reload(
+        self,
+        suffix_list_data: typing.Optional[str] = None,
+    ) -> None: ...
+
+    def update_from_file(
+        self,
+        path: typing.Union[str, os.PathLike],
+    ) -> None: ...
+
+    def iter_file(
+        self,
+        path: typing.Union[str, os.PathLike],
+        chunk_size: int = 65536,
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        num_threads: int = 1,
+        compact: bool = False,
+    ) -> FileExtractionIterator: ...
+
+    def extract_file(
+        self,
+        path: typing.Union[str, os.PathLike],
+        output_path: typing.Union[str, os.PathLike],
+        output_format: typing.Literal['tsv', 'csv', 'jsonl'] = 'tsv',
+        error_policy: typing.Literal['raise', 'skip', 'none'] = 'raise',
+        chunk_size: int = 65536,
+        num_threads: int = 1,
+    ) -> int: ...
+
+
+class FileExtractionIterator:
+    def __iter__(
+        self,
+    ) -> FileExtractionIterator: ...
+
+    def __next__(
+        self,
+    ) -> typing.List[typing.Any]: ...
+
+
+
+class LookalikeIterator:
+    def __iter__(
+        self,
+    ) -> LookalikeIterator: ...
+
+    def __next__(
+        self,
+    ) -> typing.List[typing.Tuple[str, str]]: ...
+
+class DomainMatcher:
+    def __init__(
+        self,
+        domains: typing.Iterable[str],
+        domain_extractor: typing.Optional[DomainExtractor] = None,
+    ) -> None: ...
+
+    def __len__(
+        self,
+    ) -> int: ...
+
+    def match_domain(
+        self,
+        host: str,
+    ) -> typing.Optional[typing.Tuple[str, typing.Literal['exact', 'subdomain', 'registered_domain']]]: ...
+
+    def match_many(
+        self,
+        hosts: typing.Iterable[str],
+        num_threads: int = 1,
+    ) -> typing.List[typing.Optional[typing.Tuple[str, typing.Literal['exact', 'subdomain', 'registered_domain']]]]: ...
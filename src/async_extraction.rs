@@ -0,0 +1,152 @@
+//! Batch extractions awaited from asyncio. The batch runs on a pool of native worker threads,
+//! and its future is resolved on the event loop through call_soon_threadsafe, so the event loop
+//! only ever runs the resolution itself.
+
+use pyo3::prelude::*;
+use std::collections::VecDeque;
+use std::sync::{Arc, Condvar, Mutex};
+
+type Job = Box<dyn FnOnce() + Send>;
+
+/// The jobs waiting for a worker. Idle workers wait on the condition variable, which releases
+/// the lock, so the lock is only ever held to push or pop a job.
+#[derive(Default)]
+struct JobQueue {
+    jobs: Mutex<VecDeque<Job>>,
+    job_pushed: Condvar,
+}
+
+struct WorkerPool {
+    process_id: u32,
+    job_queue: Arc<JobQueue>,
+}
+
+impl WorkerPool {
+    fn start(
+        process_id: u32,
+    ) -> Self {
+        let job_queue = Arc::new(JobQueue::default());
+        let workers_count = std::thread::available_parallelism().map_or(1, |count| count.get());
+        for _ in 0..workers_count {
+            let job_queue = job_queue.clone();
+            std::thread::spawn(move || run_worker(&job_queue));
+        }
+
+        WorkerPool {
+            process_id,
+            job_queue,
+        }
+    }
+}
+
+/// The workers are started on the first batch and live as long as the process.
+/// Each batch may still spread over num_threads threads of its own.
+fn submit(
+    job: Job,
+) {
+    static WORKER_POOL: Mutex<Option<WorkerPool>> = Mutex::new(None);
+
+    let mut worker_pool = WORKER_POOL.lock().unwrap();
+
+    // A forked child inherits the pool but none of its threads, so it starts a pool of its own.
+    // Jobs are submitted with the GIL held, as is os.fork, so the lock is never held while forking.
+    // The inherited pool is leaked rather than dropped, as its queue may have been locked by one
+    // of the parent workers when the process forked.
+    let process_id = std::process::id();
+    if !matches!(&*worker_pool, Some(pool) if pool.process_id == process_id) {
+        std::mem::forget(worker_pool.take());
+        *worker_pool = Some(WorkerPool::start(process_id));
+    }
+
+    if let Some(pool) = worker_pool.as_ref() {
+        pool.job_queue.jobs.lock().unwrap().push_back(job);
+        pool.job_queue.job_pushed.notify_one();
+    }
+}
+
+fn run_worker(
+    job_queue: &JobQueue,
+) {
+    loop {
+        let job = {
+            let mut jobs = job_queue.jobs.lock().unwrap();
+            loop {
+                match jobs.pop_front() {
+                    Some(job) => break job,
+                    None => jobs = job_queue.job_pushed.wait(jobs).unwrap(),
+                }
+            }
+        };
+        job();
+    }
+}
+
+/// Sets the outcome of a future from within its event loop. A future cancelled in the meantime
+/// is left as it is, as setting its result would raise InvalidStateError in the event loop.
+#[pyclass]
+struct FutureResolver {
+    future: PyObject,
+    outcome: Option<PyResult<PyObject>>,
+}
+
+#[pymethods]
+impl FutureResolver {
+    fn __call__(
+        &mut self,
+        py: Python,
+    ) -> PyResult<()> {
+        let future = self.future.as_ref(py);
+        if future.call_method0("done")?.is_true()? {
+            return Ok(());
+        }
+
+        match self.outcome.take() {
+            Some(Ok(result)) => future.call_method1("set_result", (result,))?,
+            Some(Err(err)) => future.call_method1("set_exception", (err.value(py),))?,
+            None => return Ok(()),
+        };
+
+        Ok(())
+    }
+}
+
+/// Returns a future of the running event loop. compute runs on a worker without the GIL,
+/// and build turns its output into the result of the future once the GIL is held again.
+pub fn spawn_future<T, C, B>(
+    py: Python,
+    compute: C,
+    build: B,
+) -> PyResult<PyObject>
+where
+    T: Send + 'static,
+    C: FnOnce() -> T + Send + 'static,
+    B: FnOnce(Python, T) -> PyResult<PyObject> + Send + 'static,
+{
+    let event_loop: PyObject = py.import("asyncio")?.call_method0("get_running_loop")?.into();
+    let future: PyObject = event_loop.call_method0(py, "create_future")?;
+
+    let job_future = future.clone_ref(py);
+    submit(
+        Box::new(
+            move || {
+                let computed = compute();
+
+                Python::with_gil(
+                    |py| {
+                        let resolver = FutureResolver {
+                            future: job_future,
+                            outcome: Some(build(py, computed)),
+                        };
+
+                        // A closed event loop refuses the callback, nobody awaits the future then
+                        if let Ok(resolver) = Py::new(py, resolver) {
+                            let _ = event_loop.call_method1(py, "call_soon_threadsafe", (resolver,));
+                        }
+                    }
+                );
+            }
+        )
+    );
+
+    Ok(future)
+}
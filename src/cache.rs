@@ -0,0 +1,161 @@
+//! A bounded cache of extraction results. Real traffic repeats the same hosts over and over,
+//! so the least recently used entries are evicted first.
+
+use ahash::AHashMap;
+
+const NIL: usize = usize::MAX;
+
+struct CacheEntry<V> {
+    key: Box<str>,
+    value: V,
+    previous: usize,
+    next: usize,
+}
+
+/// The entries are kept in a single vector, linked from the most recently used to the least
+/// recently used one, so a lookup never allocates and an eviction reuses the slot it frees.
+pub struct LruCache<V> {
+    capacity: usize,
+    index: AHashMap<Box<str>, usize>,
+    entries: Vec<CacheEntry<V>>,
+    head: usize,
+    tail: usize,
+    pub hits: u64,
+    pub misses: u64,
+    pub evictions: u64,
+}
+
+impl<V> LruCache<V> {
+    pub fn new(
+        capacity: usize,
+    ) -> Self {
+        LruCache {
+            capacity,
+            index: AHashMap::new(),
+            entries: Vec::new(),
+            head: NIL,
+            tail: NIL,
+            hits: 0,
+            misses: 0,
+            evictions: 0,
+        }
+    }
+
+    pub fn capacity(
+        &self,
+    ) -> usize {
+        self.capacity
+    }
+
+    pub fn len(
+        &self,
+    ) -> usize {
+        self.entries.len()
+    }
+
+    pub fn get(
+        &mut self,
+        key: &str,
+    ) -> Option<&V> {
+        match self.index.get(key) {
+            Some(&slot) => {
+                self.hits += 1;
+                self.unlink(slot);
+                self.push_front(slot);
+
+                Some(&self.entries[slot].value)
+            },
+            None => {
+                self.misses += 1;
+
+                None
+            },
+        }
+    }
+
+    pub fn insert(
+        &mut self,
+        key: &str,
+        value: V,
+    ) {
+        if self.capacity == 0 {
+            return;
+        }
+
+        if let Some(&slot) = self.index.get(key) {
+            self.entries[slot].value = value;
+            self.unlink(slot);
+            self.push_front(slot);
+
+            return;
+        }
+
+        let slot = if self.entries.len() < self.capacity {
+            self.entries.push(
+                CacheEntry {
+                    key: key.into(),
+                    value,
+                    previous: NIL,
+                    next: NIL,
+                }
+            );
+
+            self.entries.len() - 1
+        } else {
+            let slot = self.tail;
+            self.unlink(slot);
+            self.index.remove(&self.entries[slot].key);
+            self.evictions += 1;
+
+            let entry = &mut self.entries[slot];
+            entry.key = key.into();
+            entry.value = value;
+
+            slot
+        };
+
+        self.index.insert(key.into(), slot);
+        self.push_front(slot);
+    }
+
+    /// Drops the entries, and keeps the counters
+    pub fn clear(
+        &mut self,
+    ) {
+        self.index.clear();
+        self.entries.clear();
+        self.head = NIL;
+        self.tail = NIL;
+    }
+
+    fn unlink(
+        &mut self,
+        slot: usize,
+    ) {
+        let (previous, next) = (self.entries[slot].previous, self.entries[slot].next);
+        if previous == NIL {
+            self.head = next;
+        } else {
+            self.entries[previous].next = next;
+        }
+        if next == NIL {
+            self.tail = previous;
+        } else {
+            self.entries[next].previous = previous;
+        }
+    }
+
+    fn push_front(
+        &mut self,
+        slot: usize,
+    ) {
+        self.entries[slot].previous = NIL;
+        self.entries[slot].next = self.head;
+        if self.head == NIL {
+            self.tail = slot;
+        } else {
+            self.entries[self.head].previous = slot;
+        }
+        self.head = slot;
+    }
+}
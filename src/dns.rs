@@ -0,0 +1,96 @@
+//! Decoding of domain names in the DNS wire format (RFC 1035 section 3.1): a sequence of
+//! length prefixed labels ending with the zero length root label, possibly ending with a
+//! compression pointer to a name earlier in the same message (RFC 1035 section 4.1.4).
+
+use crate::ExtractionError;
+
+// The two high bits of a length octet tell a label, at most 63 bytes long, from a pointer.
+// The other two combinations are reserved.
+const LABEL_TYPE_MASK: u8 = 0b1100_0000;
+const POINTER_TYPE: u8 = 0b1100_0000;
+const MAX_NAME_LENGTH: usize = 255;
+
+/// The offset right after the name starting at offset, without following its pointer if any.
+/// It is where the next record field, or the next name of a sequence, starts.
+pub fn wire_name_end(
+    message: &[u8],
+    offset: usize,
+) -> Result<usize, ExtractionError> {
+    let mut position = offset;
+    loop {
+        let length_octet = *message.get(position).ok_or(ExtractionError::InvalidWireName)?;
+        match length_octet & LABEL_TYPE_MASK {
+            0 if length_octet == 0 => return Ok(position + 1),
+            0 => position += 1 + length_octet as usize,
+            POINTER_TYPE if position + 2 <= message.len() => return Ok(position + 2),
+            _ => return Err(ExtractionError::InvalidWireName),
+        }
+    }
+}
+
+/// Decodes the name starting at offset of message into its dotted form. Every pointer must point
+/// before the part of the name it ends, so that a malicious message can not loop.
+/// Labels holding a dot or invalid UTF-8 can not be told apart once dotted, and are refused.
+pub fn decode_wire_name(
+    message: &[u8],
+    offset: usize,
+) -> Result<String, ExtractionError> {
+    let mut name = String::new();
+    let mut wire_length = 0;
+    let mut position = offset;
+    let mut part_start = offset;
+    loop {
+        let length_octet = *message.get(position).ok_or(ExtractionError::InvalidWireName)?;
+        match length_octet & LABEL_TYPE_MASK {
+            0 if length_octet == 0 => break,
+            0 => {
+                let length = length_octet as usize;
+                let label = message.get(position + 1..position + 1 + length).ok_or(ExtractionError::InvalidWireName)?;
+
+                wire_length += 1 + length;
+                if wire_length >= MAX_NAME_LENGTH {
+                    return Err(ExtractionError::InvalidWireName);
+                }
+                if memchr::memchr(b'.', label).is_some() {
+                    return Err(ExtractionError::InvalidDomain);
+                }
+
+                if !name.is_empty() {
+                    name.push('.');
+                }
+                name.push_str(std::str::from_utf8(label).map_err(|_| ExtractionError::InvalidDomain)?);
+                position += 1 + length;
+            },
+            POINTER_TYPE => {
+                let low_octet = *message.get(position + 1).ok_or(ExtractionError::InvalidWireName)?;
+                let target = ((length_octet & !LABEL_TYPE_MASK) as usize) << 8 | low_octet as usize;
+                if target >= part_start {
+                    return Err(ExtractionError::InvalidWireName);
+                }
+                position = target;
+                part_start = target;
+            },
+            _ => return Err(ExtractionError::InvalidWireName),
+        }
+    }
+
+    if name.is_empty() {
+        return Err(ExtractionError::InvalidDomain);
+    }
+
+    Ok(name)
+}
+
+/// The offsets of the names of a buffer holding nothing but names, one after the other
+pub fn wire_name_offsets(
+    names: &[u8],
+) -> Result<Vec<usize>, ExtractionError> {
+    let mut offsets = Vec::new();
+    let mut offset = 0;
+    while offset < names.len() {
+        offsets.push(offset);
+        offset = wire_name_end(names, offset)?;
+    }
+
+    Ok(offsets)
+}
@@ -0,0 +1,317 @@
+//! Extraction of newline delimited files. The input is memory mapped and processed in chunks,
+//! so the memory used does not depend on the size of the file.
+
+use crate::{lowercase_domain, parallel_map, DomainSpans, ErrorPolicy, ExtractionError, SuffixTrie};
+use pyo3::exceptions::PyValueError;
+use pyo3::prelude::*;
+use std::fs::File;
+use std::io::{BufWriter, Write};
+use std::path::Path;
+
+#[derive(Clone, Copy)]
+pub enum OutputFormat {
+    Tsv,
+    Csv,
+    Jsonl,
+}
+
+impl OutputFormat {
+    pub fn parse(
+        output_format: &str,
+    ) -> PyResult<Self> {
+        match output_format {
+            "tsv" => Ok(OutputFormat::Tsv),
+            "csv" => Ok(OutputFormat::Csv),
+            "jsonl" => Ok(OutputFormat::Jsonl),
+            _ => Err(
+                PyValueError::new_err("output_format must be one of: 'tsv', 'csv', 'jsonl'")
+            ),
+        }
+    }
+}
+
+/// Maps an input file. Empty files are not mapped at all, as some platforms refuse to.
+pub fn map_input_file(
+    path: &Path,
+) -> PyResult<Option<memmap2::Mmap>> {
+    let file = File::open(path)?;
+    if file.metadata()?.len() == 0 {
+        return Ok(None);
+    }
+
+    // The mapping is read only. The file must not be truncated while it is being read.
+    Ok(Some(unsafe { memmap2::Mmap::map(&file)? }))
+}
+
+/// Splits data into lines, without the line terminators and the trailing whitespace,
+/// the same way `line.rstrip()` would
+pub struct Lines<'a> {
+    data: &'a [u8],
+    position: usize,
+}
+
+impl<'a> Lines<'a> {
+    pub fn new(
+        data: &'a [u8],
+        position: usize,
+    ) -> Self {
+        Lines { data, position }
+    }
+
+    /// The offset of the first line that was not returned yet
+    pub fn position(
+        &self,
+    ) -> usize {
+        self.position
+    }
+}
+
+impl<'a> Iterator for Lines<'a> {
+    type Item = &'a [u8];
+
+    fn next(
+        &mut self,
+    ) -> Option<Self::Item> {
+        if self.position >= self.data.len() {
+            return None;
+        }
+
+        let rest = &self.data[self.position..];
+        let line = match memchr::memchr(b'\n', rest) {
+            Some(newline_index) => {
+                self.position += newline_index + 1;
+
+                &rest[..newline_index]
+            },
+            None => {
+                self.position = self.data.len();
+
+                rest
+            },
+        };
+
+        let mut line_end = line.len();
+        while line_end > 0 && line[line_end - 1].is_ascii_whitespace() {
+            line_end -= 1;
+        }
+
+        Some(&line[..line_end])
+    }
+}
+
+/// Whether both paths name the same existing file. Hard links are told apart by device and
+/// inode where there are any, and by canonical path elsewhere.
+fn is_same_file(
+    path: &Path,
+    other_path: &Path,
+) -> bool {
+    #[cfg(unix)]
+    {
+        use std::os::unix::fs::MetadataExt;
+
+        match (std::fs::metadata(path), std::fs::metadata(other_path)) {
+            (Ok(metadata), Ok(other_metadata)) => {
+                metadata.dev() == other_metadata.dev() && metadata.ino() == other_metadata.ino()
+            },
+            _ => false,
+        }
+    }
+
+    #[cfg(not(unix))]
+    {
+        match (std::fs::canonicalize(path), std::fs::canonicalize(other_path)) {
+            (Ok(canonical_path), Ok(other_canonical_path)) => canonical_path == other_canonical_path,
+            _ => false,
+        }
+    }
+}
+
+pub fn line_spans<'a>(
+    suffix_trie: &SuffixTrie,
+    line: &'a [u8],
+) -> Result<(&'a str, DomainSpans), ExtractionError> {
+    let domain = std::str::from_utf8(line).map_err(|_| ExtractionError::InvalidDomain)?;
+
+    Ok((domain, suffix_trie.domain_spans(domain)?))
+}
+
+/// Extracts every line of the input file into one record of the output file, and returns the number of
+/// records written. The records are formatted by the worker threads, and written in the input order.
+#[allow(clippy::too_many_arguments)]
+pub fn extract_file(
+    suffix_trie: &SuffixTrie,
+    path: &Path,
+    output_path: &Path,
+    output_format: OutputFormat,
+    error_policy: ErrorPolicy,
+    chunk_size: usize,
+    num_threads: usize,
+) -> PyResult<usize> {
+    // Creating the output would truncate the mapped input, and reading it afterwards would crash
+    if is_same_file(path, output_path) {
+        return Err(PyValueError::new_err("output_path must not be the input file"));
+    }
+
+    let input = map_input_file(path)?;
+    let mut lines = Lines::new(input.as_deref().unwrap_or_default(), 0);
+    let mut output = BufWriter::new(File::create(output_path)?);
+
+    write_header(&mut output, output_format)?;
+
+    let mut records_count = 0;
+    let mut chunk: Vec<&[u8]> = Vec::with_capacity(chunk_size);
+    loop {
+        chunk.clear();
+        chunk.extend(lines.by_ref().take(chunk_size.max(1)));
+        if chunk.is_empty() {
+            break;
+        }
+
+        let records = parallel_map(
+            &chunk,
+            num_threads,
+            |line| -> Result<Vec<u8>, ExtractionError> {
+                let (domain, spans) = line_spans(suffix_trie, line)?;
+                let domain_string = lowercase_domain(domain)?;
+
+                let mut record = Vec::with_capacity(line.len() * 2 + 32);
+                write_record(&mut record, output_format, line, Some(spans.parts(domain_string.as_str())));
+
+                Ok(record)
+            },
+        );
+
+        for (line, record) in chunk.iter().zip(records) {
+            match record {
+                Ok(record) => output.write_all(&record)?,
+                Err(err) => match error_policy {
+                    ErrorPolicy::Raise => return Err(err.into()),
+                    ErrorPolicy::Skip => continue,
+                    ErrorPolicy::EmitNone => {
+                        let mut record = Vec::new();
+                        write_record(&mut record, output_format, line, None);
+                        output.write_all(&record)?;
+                    },
+                },
+            }
+            records_count += 1;
+        }
+    }
+
+    output.flush()?;
+
+    Ok(records_count)
+}
+
+fn write_header(
+    output: &mut impl Write,
+    output_format: OutputFormat,
+) -> std::io::Result<()> {
+    match output_format {
+        OutputFormat::Tsv => output.write_all(b"input\tsuffix\tdomain\tsubdomain\n"),
+        OutputFormat::Csv => output.write_all(b"input,suffix,domain,subdomain\n"),
+        OutputFormat::Jsonl => Ok(()),
+    }
+}
+
+/// Formats a single record. Invalid domains, written with error_policy='none', have no parts:
+/// empty fields in tsv and csv, and null values in jsonl.
+fn write_record(
+    record: &mut Vec<u8>,
+    output_format: OutputFormat,
+    input: &[u8],
+    parts: Option<(&str, &str, &str)>,
+) {
+    let input = String::from_utf8_lossy(input);
+    let (suffix_part, domain_part, subdomain_part) = parts.unwrap_or_default();
+
+    match output_format {
+        OutputFormat::Tsv => {
+            for (index, field) in [&*input, suffix_part, domain_part, subdomain_part].iter().enumerate() {
+                if index > 0 {
+                    record.push(b'\t');
+                }
+                write_tsv_field(record, field);
+            }
+        },
+        OutputFormat::Csv => {
+            for (index, field) in [&*input, suffix_part, domain_part, subdomain_part].iter().enumerate() {
+                if index > 0 {
+                    record.push(b',');
+                }
+                write_csv_field(record, field);
+            }
+        },
+        OutputFormat::Jsonl => {
+            record.extend_from_slice(b"{\"input\": ");
+            write_json_string(record, &input);
+            for (key, field) in [("suffix", suffix_part), ("domain", domain_part), ("subdomain", subdomain_part)] {
+                record.extend_from_slice(b", \"");
+                record.extend_from_slice(key.as_bytes());
+                record.extend_from_slice(b"\": ");
+                if parts.is_some() {
+                    write_json_string(record, field);
+                } else {
+                    record.extend_from_slice(b"null");
+                }
+            }
+            record.push(b'}');
+        },
+    }
+
+    record.push(b'\n');
+}
+
+/// Tabs, carriage returns and backslashes are escaped with a backslash, as in the linear tsv convention
+fn write_tsv_field(
+    record: &mut Vec<u8>,
+    field: &str,
+) {
+    for byte in field.bytes() {
+        match byte {
+            b'\t' => record.extend_from_slice(b"\\t"),
+            b'\r' => record.extend_from_slice(b"\\r"),
+            b'\\' => record.extend_from_slice(b"\\\\"),
+            _ => record.push(byte),
+        }
+    }
+}
+
+/// Fields holding a separator, a quote or a carriage return are quoted as described in RFC 4180
+fn write_csv_field(
+    record: &mut Vec<u8>,
+    field: &str,
+) {
+    if !field.bytes().any(|byte| matches!(byte, b',' | b'"' | b'\r')) {
+        record.extend_from_slice(field.as_bytes());
+
+        return;
+    }
+
+    record.push(b'"');
+    for byte in field.bytes() {
+        if byte == b'"' {
+            record.push(b'"');
+        }
+        record.push(byte);
+    }
+    record.push(b'"');
+}
+
+fn write_json_string(
+    record: &mut Vec<u8>,
+    string: &str,
+) {
+    record.push(b'"');
+    for byte in string.bytes() {
+        match byte {
+            b'"' => record.extend_from_slice(b"\\\""),
+            b'\\' => record.extend_from_slice(b"\\\\"),
+            b'\t' => record.extend_from_slice(b"\\t"),
+            b'\r' => record.extend_from_slice(b"\\r"),
+            0x00..=0x1f => record.extend_from_slice(format!("\\u{:04x}", byte).as_bytes()),
+            _ => record.push(byte),
+        }
+    }
+    record.push(b'"');
+}
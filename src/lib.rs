@@ -1,353 +1,2170 @@
-use ahash::{AHashMap, AHashSet};
-use pyo3::exceptions::PyValueError;
+mod async_extraction;
+mod cache;
+mod dns;
+mod file_extraction;
+mod lookalike;
+mod matcher;
+mod suffix_list;
+mod url;
+
+use pyo3::exceptions::{PyIndexError, PyValueError};
+use pyo3::pyclass::CompareOp;
 use pyo3::intern;
 use pyo3::prelude::*;
-use pyo3::types::PyString;
+use pyo3::buffer::PyBuffer;
+use pyo3::types::{PyBytes, PyDict, PyList, PyString, PyTuple};
+use std::borrow::Cow;
+use std::fmt;
+use std::fs::File;
+use std::io::{Read, Seek};
+use std::ops::Range;
 use std::os::raw::c_char;
+use std::path::{Path, PathBuf};
+use std::sync::{Arc, Mutex, RwLock, TryLockError};
+use async_extraction::spawn_future;
+use cache::LruCache;
+use dns::{decode_wire_name, wire_name_offsets};
+use file_extraction::{line_spans, map_input_file, Lines, OutputFormat};
+use lookalike::{generate_lookalikes, LookalikeIterator, LookalikeKind};
+use suffix_list::{compile_suffix_list, parse_suffix_list, CompiledSuffixList, COMPILED_MAGIC};
+use url::{decode_host, scan_url, HostKind, UrlComponents, UrlHost};
 
 type DomainString = arraystring::ArrayString<typenum::U255>;
+type OutputParts<'a> = (Cow<'a, str>, Cow<'a, str>, Cow<'a, str>);
+
+// Below this amount of items per thread, spawning threads costs more than it saves
+const MIN_ITEMS_PER_THREAD: usize = 1024;
 
-#[derive(Default)]
-struct Suffix {
-    sub_suffixes: AHashMap<String, Suffix>,
-    is_wildcard: bool,
-    sub_blacklist: AHashSet<String>,
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum ExtractionError {
+    InvalidDomain,
+    NoScheme,
+    NoDomain,
+    UrlTooLong,
+    InvalidPort,
+    InvalidWireName,
 }
 
-static PUBLIC_SUFFIX_LIST_DATA: &str = include_str!("public_suffix_list.dat");
+impl fmt::Display for ExtractionError {
+    fn fmt(
+        &self,
+        f: &mut fmt::Formatter,
+    ) -> fmt::Result {
+        f.write_str(
+            match self {
+                ExtractionError::InvalidDomain => "Invalid domain detected",
+                ExtractionError::NoScheme => "url is invalid: no scheme",
+                ExtractionError::NoDomain => "url does not contain a domain",
+                ExtractionError::UrlTooLong => "url is invalid: too long",
+                ExtractionError::InvalidPort => "url is invalid: invalid port",
+                ExtractionError::InvalidWireName => "wire format name is invalid",
+            }
+        )
+    }
+}
 
-#[pyclass]
-struct DomainExtractor {
-    suffixes: AHashMap<String, Suffix>,
-    tld_list: Vec<String>,
+impl From<ExtractionError> for PyErr {
+    fn from(
+        err: ExtractionError,
+    ) -> PyErr {
+        PyValueError::new_err(err.to_string())
+    }
+}
+
+/// The reason a domain failed validation
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+enum ValidationError {
+    InvalidLength,
+    InvalidLabelLength,
+    InvalidHyphen,
+    InvalidCharacter,
+    NotRegistrable,
+    InvalidIdna,
+}
+
+impl ValidationError {
+    fn code(
+        &self,
+    ) -> &'static str {
+        match self {
+            ValidationError::InvalidLength => "invalid_length",
+            ValidationError::InvalidLabelLength => "invalid_label_length",
+            ValidationError::InvalidHyphen => "invalid_hyphen",
+            ValidationError::InvalidCharacter => "invalid_character",
+            ValidationError::NotRegistrable => "not_registrable",
+            ValidationError::InvalidIdna => "invalid_idna",
+        }
+    }
+}
+
+#[derive(Clone, Copy)]
+enum ErrorPolicy {
+    Raise,
+    Skip,
+    EmitNone,
+}
+
+impl ErrorPolicy {
+    fn parse(
+        error_policy: &str,
+    ) -> PyResult<Self> {
+        match error_policy {
+            "raise" => Ok(ErrorPolicy::Raise),
+            "skip" => Ok(ErrorPolicy::Skip),
+            "none" => Ok(ErrorPolicy::EmitNone),
+            _ => Err(
+                PyValueError::new_err("error_policy must be one of: 'raise', 'skip', 'none'")
+            ),
+        }
+    }
+}
+
+/// The form the parts are returned in. Labels are converted with IDNA, as the suffix list holds both forms.
+#[derive(Clone, Copy, PartialEq, Eq)]
+enum OutputForm {
+    AsIs,
+    Ascii,
+    Unicode,
+}
+
+impl OutputForm {
+    fn parse(
+        output_form: &str,
+    ) -> PyResult<Self> {
+        match output_form {
+            "as_is" => Ok(OutputForm::AsIs),
+            "ascii" => Ok(OutputForm::Ascii),
+            "unicode" => Ok(OutputForm::Unicode),
+            _ => Err(
+                PyValueError::new_err("output_form must be one of: 'as_is', 'ascii', 'unicode'")
+            ),
+        }
+    }
+
+    /// Converts a part, borrowing it whenever the conversion can not change it
+    fn convert<'a>(
+        &self,
+        part: &'a str,
+    ) -> Result<Cow<'a, str>, ExtractionError> {
+        match self {
+            OutputForm::Ascii if !part.is_ascii() => {
+                idna::domain_to_ascii(part).map(Cow::Owned).map_err(|_| ExtractionError::InvalidDomain)
+            },
+            OutputForm::Unicode if memchr::memmem::find(part.as_bytes(), b"xn--").is_some() => {
+                match idna::domain_to_unicode(part) {
+                    (unicode_part, Ok(())) => Ok(Cow::Owned(unicode_part)),
+                    (_, Err(_)) => Err(ExtractionError::InvalidDomain),
+                }
+            },
+            _ => Ok(Cow::Borrowed(part)),
+        }
+    }
+
+    fn convert_parts<'a>(
+        &self,
+        (suffix_part, domain_part, subdomain_part): (&'a str, &'a str, &'a str),
+    ) -> Result<OutputParts<'a>, ExtractionError> {
+        Ok((self.convert(suffix_part)?, self.convert(domain_part)?, self.convert(subdomain_part)?))
+    }
+}
+
+/// The form a result is returned in: a dict of str, a dict of bytes, or an ExtractResult
+#[derive(Clone, Copy, PartialEq, Eq)]
+enum ResultForm {
+    Dict,
+    BytesDict,
+    Compact,
+}
+
+impl ResultForm {
+    fn new(
+        compact: bool,
+        return_bytes: bool,
+    ) -> PyResult<Self> {
+        match (compact, return_bytes) {
+            (false, false) => Ok(ResultForm::Dict),
+            (false, true) => Ok(ResultForm::BytesDict),
+            (true, false) => Ok(ResultForm::Compact),
+            (true, true) => Err(
+                PyValueError::new_err("compact and return_bytes can not be used together")
+            ),
+        }
+    }
+}
+
+static COMPILED_PUBLIC_SUFFIX_LIST: &[u8] = include_bytes!(concat!(env!("OUT_DIR"), "/public_suffix_list.bin"));
+
+/// The storage behind a compiled suffix list. Static and mapped data live in pages
+/// shared by every process using them, forked workers included.
+enum SuffixListData {
+    Static(&'static [u8]),
+    Owned(Vec<u8>),
+    Mapped(memmap2::Mmap),
+}
+
+impl AsRef<[u8]> for SuffixListData {
+    fn as_ref(
+        &self,
+    ) -> &[u8] {
+        match self {
+            SuffixListData::Static(data) => data,
+            SuffixListData::Owned(data) => data,
+            SuffixListData::Mapped(data) => data,
+        }
+    }
+}
+
+/// A compact, immutable alternative to the result dict.
+/// Behaves like a (suffix, domain, subdomain) tuple with named fields.
+/// is_private tells whether the suffix comes from the private section of the list,
+/// and host_type whether the host of a url is a domain or an IP address. Neither is part of the tuple.
+#[pyclass(module = "pydomainextractor.pydomainextractor")]
+struct ExtractResult {
+    suffix: Py<PyString>,
+    domain: Py<PyString>,
+    subdomain: Py<PyString>,
+    is_private: bool,
+    host_kind: HostKind,
+}
+
+impl ExtractResult {
+    fn as_tuple<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> &'py PyTuple {
+        PyTuple::new(
+            py,
+            [
+                self.suffix.clone_ref(py),
+                self.domain.clone_ref(py),
+                self.subdomain.clone_ref(py),
+            ],
+        )
+    }
 }
 
 #[pymethods]
-impl DomainExtractor {
+impl ExtractResult {
     #[new]
+    #[args(is_private = "false", host_type = "\"domain\"")]
     fn new(
-        suffix_list: Option<&str>,
-    ) -> Self {
-        let (suffixes, tld_list) = if let Some(suffix_list) = suffix_list {
-            parse_suffix_list(suffix_list)
+        suffix: Py<PyString>,
+        domain: Py<PyString>,
+        subdomain: Py<PyString>,
+        is_private: bool,
+        host_type: &str,
+    ) -> PyResult<Self> {
+        let host_kind = HostKind::parse(host_type).ok_or_else(
+            || PyValueError::new_err("host_type must be one of: 'domain', 'ipv4', 'ipv6'")
+        )?;
+
+        Ok(ExtractResult { suffix, domain, subdomain, is_private, host_kind })
+    }
+
+    #[getter]
+    fn suffix(
+        &self,
+        py: Python,
+    ) -> Py<PyString> {
+        self.suffix.clone_ref(py)
+    }
+
+    #[getter]
+    fn domain(
+        &self,
+        py: Python,
+    ) -> Py<PyString> {
+        self.domain.clone_ref(py)
+    }
+
+    #[getter]
+    fn subdomain(
+        &self,
+        py: Python,
+    ) -> Py<PyString> {
+        self.subdomain.clone_ref(py)
+    }
+
+    #[getter]
+    fn is_private(
+        &self,
+    ) -> bool {
+        self.is_private
+    }
+
+    #[getter]
+    fn host_type(
+        &self,
+    ) -> &'static str {
+        self.host_kind.name()
+    }
+
+    fn as_dict(
+        &self,
+        py: Python,
+    ) -> PyResult<PyObject> {
+        let dict = PyDict::new(py);
+        dict.set_item(intern!(py, "suffix"), &self.suffix)?;
+        dict.set_item(intern!(py, "domain"), &self.domain)?;
+        dict.set_item(intern!(py, "subdomain"), &self.subdomain)?;
+
+        Ok(dict.to_object(py))
+    }
+
+    fn __len__(
+        &self,
+    ) -> usize {
+        3
+    }
+
+    fn __getitem__(
+        &self,
+        py: Python,
+        index: isize,
+    ) -> PyResult<Py<PyString>> {
+        match if index < 0 { index + 3 } else { index } {
+            0 => Ok(self.suffix.clone_ref(py)),
+            1 => Ok(self.domain.clone_ref(py)),
+            2 => Ok(self.subdomain.clone_ref(py)),
+            _ => Err(PyIndexError::new_err("ExtractResult index out of range")),
+        }
+    }
+
+    fn __iter__(
+        &self,
+        py: Python,
+    ) -> PyResult<PyObject> {
+        Ok(self.as_tuple(py).call_method0("__iter__")?.to_object(py))
+    }
+
+    fn __hash__(
+        &self,
+        py: Python,
+    ) -> PyResult<isize> {
+        self.as_tuple(py).hash()
+    }
+
+    fn __richcmp__(
+        &self,
+        py: Python,
+        other: &PyAny,
+        op: CompareOp,
+    ) -> PyResult<PyObject> {
+        let other_tuple = if let Ok(other) = other.extract::<PyRef<ExtractResult>>() {
+            other.as_tuple(py)
+        } else if let Ok(other) = other.downcast::<PyTuple>() {
+            other
         } else {
-            parse_suffix_list(PUBLIC_SUFFIX_LIST_DATA)
+            return Ok(py.NotImplemented());
         };
 
-        DomainExtractor { suffixes, tld_list }
+        Ok(self.as_tuple(py).rich_compare(other_tuple, op)?.to_object(py))
     }
 
-    fn parse_domain_parts<'a>(
+    fn __repr__(
         &self,
-        domain: &'a str,
-    ) -> PyResult<(&'a str, &'a str, &'a str)> {
-        let mut suffix_part = "";
-        let mut current_suffixes = &self.suffixes;
-        let mut last_dot_index = domain.len();
-        let mut in_wildcard_tld = false;
-        let mut last_suffix: Option<&Suffix> = None;
-
-        while let Some(dot_index) = memchr::memrchr(b'.', &domain.as_bytes()[..last_dot_index]) {
-            let current_fraction = &domain[dot_index + 1..last_dot_index];
-            if current_fraction.is_empty() || dot_index == 0 {
-                return Err(PyValueError::new_err("Invalid domain detected"));
-            }
+        py: Python,
+    ) -> PyResult<String> {
+        Ok(
+            format!(
+                "ExtractResult(suffix={}, domain={}, subdomain={})",
+                self.suffix.as_ref(py).repr()?,
+                self.domain.as_ref(py).repr()?,
+                self.subdomain.as_ref(py).repr()?,
+            )
+        )
+    }
 
-            if in_wildcard_tld {
-                if last_suffix.unwrap().sub_blacklist.contains(current_fraction) {
-                    let leftover_part = &domain[0..dot_index];
+    fn __reduce__(
+        &self,
+        py: Python,
+    ) -> (PyObject, PyObject) {
+        (
+            py.get_type::<ExtractResult>().to_object(py),
+            (
+                self.suffix.clone_ref(py),
+                self.domain.clone_ref(py),
+                self.subdomain.clone_ref(py),
+                self.is_private,
+                self.host_kind.name(),
+            ).to_object(py),
+        )
+    }
+}
 
-                    return Ok((suffix_part, current_fraction, leftover_part));
-                }
+/// The suffix list an extraction runs against. Reloading replaces the trie held by the extractor,
+/// while the extractions already running keep using the one they started with.
+struct SuffixTrie {
+    suffix_list: CompiledSuffixList<SuffixListData>,
+}
 
-                if let Some(current_suffix) = current_suffixes.get(current_fraction) {
-                    if !current_suffix.is_wildcard {
-                        current_suffixes = &current_suffix.sub_suffixes;
-                    }
-                    last_suffix.replace(current_suffix);
-                    suffix_part = &domain[dot_index + 1..];
-                    last_dot_index = dot_index;
-                } else {
-                    suffix_part = &domain[dot_index + 1..];
-                    let leftover_part = &domain[0..dot_index];
-                    match leftover_part.rsplit_once('.') {
-                        Some((subdomain_part, domain_part)) => {
-                            if subdomain_part.ends_with('.') {
-                                return Err(PyValueError::new_err("Invalid domain detected"));
-                            }
-                            return Ok((suffix_part, domain_part, subdomain_part));
-                        }
-                        None => {
-                            return Ok((suffix_part, leftover_part, ""));
-                        }
-                    }
-                }
-            }
-            if let Some(current_suffix) = current_suffixes.get(current_fraction) {
-                in_wildcard_tld = current_suffix.is_wildcard;
+/// The results cache holds compact results, which are immutable and therefore shared between the callers
+#[pyclass(module = "pydomainextractor.pydomainextractor")]
+struct DomainExtractor {
+    suffix_trie: RwLock<Arc<SuffixTrie>>,
+    results_cache: Option<Mutex<LruCache<Py<ExtractResult>>>>,
+}
 
-                current_suffixes = &current_suffix.sub_suffixes;
-                last_suffix.replace(current_suffix);
-                suffix_part = &domain[dot_index + 1..];
-                last_dot_index = dot_index;
-            } else {
-                let leftover_part = &domain[0..last_dot_index];
-                match leftover_part.rsplit_once('.') {
-                    Some((subdomain_part, domain_part)) => {
-                        if subdomain_part.ends_with('.') {
-                            return Err(PyValueError::new_err("Invalid domain detected"));
-                        }
-                        return Ok((suffix_part, domain_part, subdomain_part));
-                    }
-                    None => {
-                        return Ok((suffix_part, leftover_part, ""));
-                    }
-                };
-            }
+impl DomainExtractor {
+    fn from_suffix_trie(
+        suffix_trie: SuffixTrie,
+        cache_size: usize,
+    ) -> Self {
+        DomainExtractor {
+            suffix_trie: RwLock::new(Arc::new(suffix_trie)),
+            results_cache: if cache_size > 0 { Some(Mutex::new(LruCache::new(cache_size))) } else { None },
         }
+    }
 
-        let current_fraction = &domain[0..last_dot_index];
-        if in_wildcard_tld {
-            if last_suffix.unwrap().sub_blacklist.contains(current_fraction) {
-                Ok((suffix_part, current_fraction, ""))
-            } else {
-                Ok((domain, "", ""))
+    /// A snapshot of the suffix trie, which a reload does not change. Batch calls take one,
+    /// so the trie outlives the lock while the GIL is released.
+    fn suffix_trie(
+        &self,
+    ) -> Arc<SuffixTrie> {
+        self.suffix_trie.read().unwrap().clone()
+    }
+
+    /// Runs f on the suffix trie under the read lock, without the reference count updates of
+    /// a snapshot. Single calls hold the GIL throughout, which a reload waiting for the lock releases.
+    fn with_suffix_trie<R>(
+        &self,
+        f: impl FnOnce(&SuffixTrie) -> R,
+    ) -> R {
+        f(&self.suffix_trie.read().unwrap())
+    }
+
+    fn replace_suffix_trie(
+        &self,
+        py: Python,
+        suffix_trie: SuffixTrie,
+    ) {
+        // The GIL is released while waiting, as a reader holding the lock may need it to finish
+        let mut current_suffix_trie = loop {
+            match self.suffix_trie.try_write() {
+                Err(TryLockError::WouldBlock) => py.allow_threads(std::thread::yield_now),
+                locked => break locked.unwrap(),
             }
-        } else if current_suffixes.len() > 0 && current_suffixes.contains_key(current_fraction) {
-            Ok((domain, "", ""))
-        } else {
-            Ok((suffix_part, current_fraction, ""))
+        };
+        let previous_suffix_trie = std::mem::replace(
+            &mut *current_suffix_trie,
+            Arc::new(suffix_trie),
+        );
+        drop(current_suffix_trie);
+
+        // Released outside of the lock, and only freed once the last extraction using it is done
+        drop(previous_suffix_trie);
+
+        if let Some(results_cache) = &self.results_cache {
+            results_cache.lock().unwrap().clear();
         }
     }
 
-    fn extract(
+    /// Extracts through the results cache. Only the default output form and sections are cached,
+    /// as they are what the repeated lookups of live traffic use.
+    fn extract_cached(
         &self,
         py: Python,
-        domain: &PyString,
-    ) -> PyResult<PyObject> {
-        if domain.len().unwrap() > 255 {
-            return Err(PyValueError::new_err("Invalid domain detected"));
+        domain: &str,
+        results_cache: &Mutex<LruCache<Py<ExtractResult>>>,
+    ) -> PyResult<Py<ExtractResult>> {
+        if let Some(extract_result) = results_cache.lock().unwrap().get(domain) {
+            return Ok(extract_result.clone_ref(py));
         }
 
-        let mut domain_string = unsafe {
-            DomainString::from_str_unchecked(domain.to_string_lossy().as_ref())
-        };
-        domain_string.make_ascii_lowercase();
+        let extract_result: Py<ExtractResult> = self.with_suffix_trie(
+            |suffix_trie| suffix_trie.extract_domain(py, domain, ResultForm::Compact, OutputForm::AsIs, true)
+        )?.extract(py)?;
+        results_cache.lock().unwrap().insert(domain, extract_result.clone_ref(py));
 
-        let (suffix_part, domain_part, subdomain_part) = self.parse_domain_parts(domain_string.as_str())?;
+        Ok(extract_result)
+    }
+}
 
-        unsafe {
-            let dict = pyo3::ffi::PyDict_New();
-            for (fraction_key, fraction) in [
-                (intern!(py, "suffix").into_ptr(), suffix_part),
-                (intern!(py, "domain").into_ptr(), domain_part),
-                (intern!(py, "subdomain").into_ptr(), subdomain_part),
-            ] {
-                if !fraction.is_empty() {
-                    let substr = pyo3::ffi::PyUnicode_FromStringAndSize(
-                        fraction.as_ptr() as *const c_char,
-                        fraction.len() as isize,
-                    );
-
-                    pyo3::ffi::PyDict_SetItem(
-                        dict,
-                        fraction_key,
-                        substr,
-                    );
-                    pyo3::ffi::Py_DECREF(substr);
-                } else {
-                    pyo3::ffi::PyDict_SetItem(
-                        dict,
-                        fraction_key,
-                        intern!(py, "").into_ptr(),
-                    );
-                }
-            }
+impl SuffixTrie {
+    fn from_suffix_list(
+        suffix_list: Option<&str>,
+    ) -> Self {
+        let suffix_list_data = if let Some(suffix_list) = suffix_list {
+            SuffixListData::Owned(compile_suffix_list(&parse_suffix_list(suffix_list)))
+        } else {
+            SuffixListData::Static(COMPILED_PUBLIC_SUFFIX_LIST)
+        };
 
-            Ok(pyo3::PyObject::from_owned_ptr(py, dict))
+        SuffixTrie {
+            suffix_list: CompiledSuffixList::new(suffix_list_data).unwrap(),
         }
     }
 
-    fn is_valid_domain(
+    fn from_compiled_data(
+        suffix_list_data: SuffixListData,
+    ) -> PyResult<Self> {
+        let suffix_list = CompiledSuffixList::new(suffix_list_data).map_err(PyValueError::new_err)?;
+        suffix_list.validate().map_err(PyValueError::new_err)?;
+
+        Ok(SuffixTrie { suffix_list })
+    }
+
+    /// Whether the trie is the suffix list bundled with the library, which every process already holds
+    fn is_bundled(
         &self,
-        domain: &PyString,
     ) -> bool {
-        let domain_len = domain.len().unwrap();
-        if domain_len == 0 || domain_len > 255 {
-            return false;
-        }
+        std::ptr::eq(self.suffix_list.as_bytes(), COMPILED_PUBLIC_SUFFIX_LIST)
+    }
 
-        let mut domain_string = unsafe {
-            DomainString::from_str_unchecked(domain.to_string_lossy().as_ref())
-        };
+    fn from_compiled_file(
+        file: &File,
+    ) -> PyResult<Self> {
+        // The mapping is read only and shared. The file must not be modified while it is in use,
+        // so new versions should be written to a different path and renamed over the old one.
+        let mmap = unsafe { memmap2::Mmap::map(file)? };
 
-        for fraction in domain_string.split('.') {
-            if fraction.len() > 63 || fraction.is_empty() {
-                return false;
-            }
-            if fraction.starts_with('-') || fraction.ends_with('-') {
-                return false;
-            }
+        SuffixTrie::from_compiled_data(SuffixListData::Mapped(mmap))
+    }
 
-            for ch in fraction.chars() {
-                if !ch.is_alphanumeric() && ch != '-' {
-                    return false;
-                }
-            }
+    /// Loads either a compiled suffix list or a suffix list in the PublicSuffixList format
+    fn from_file(
+        path: &Path,
+    ) -> PyResult<Self> {
+        let mut file = File::open(path)?;
+        let mut magic = [0; 4];
+        if file.read_exact(&mut magic).is_ok() && &magic == COMPILED_MAGIC {
+            return SuffixTrie::from_compiled_file(&file);
         }
 
-        domain_string.make_ascii_lowercase();
-        if let Ok((suffix_part, domain_part, _subdomain_part)) = self.parse_domain_parts(domain_string.as_str()) {
-            if suffix_part.is_empty() || domain_part.is_empty() {
-                return false;
-            }
+        let mut suffix_list = String::new();
+        file.rewind()?;
+        file.read_to_string(&mut suffix_list)?;
 
-            if idna::domain_to_ascii(domain_string.as_str()).is_err() {
-                return false;
-            }
-            if idna::domain_to_unicode(domain_string.as_str()).1.is_err() {
-                return false;
-            }
+        Ok(SuffixTrie::from_suffix_list(Some(&suffix_list)))
+    }
 
-            true
-        } else {
-            false
-        }
+    fn parse_domain_parts<'a>(
+        &self,
+        domain: &'a str,
+    ) -> Result<(&'a str, &'a str, &'a str), ExtractionError> {
+        self.parse_domain_sections(domain, true).map(|(parts, _is_private)| parts)
     }
 
-    fn get_tld_list(
+    fn parse_domain_sections<'a>(
         &self,
-    ) -> Vec<String> {
-        self.tld_list.clone()
+        domain: &'a str,
+        include_private: bool,
+    ) -> Result<((&'a str, &'a str, &'a str), bool), ExtractionError> {
+        self.suffix_list.parse_domain_sections(domain, include_private).ok_or(ExtractionError::InvalidDomain)
     }
 
-    fn extract_from_url(
+    fn domain_spans(
+        &self,
+        domain: &str,
+    ) -> Result<DomainSpans, ExtractionError> {
+        self.domain_spans_with_sections(domain, true)
+    }
+
+    fn domain_spans_with_sections(
+        &self,
+        domain: &str,
+        include_private: bool,
+    ) -> Result<DomainSpans, ExtractionError> {
+        let domain_string = lowercase_domain(domain)?;
+        let ((suffix_part, domain_part, subdomain_part), is_private) = self.parse_domain_sections(domain_string.as_str(), include_private)?;
+
+        Ok(
+            DomainSpans {
+                is_private,
+                ..DomainSpans::from_parts(domain_string.as_str().len(), suffix_part, domain_part, subdomain_part)
+            }
+        )
+    }
+
+    fn extract_domain(
         &self,
         py: Python,
-        url: &PyString,
+        domain: &str,
+        result_form: ResultForm,
+        output_form: OutputForm,
+        include_private: bool,
     ) -> PyResult<PyObject> {
-        let mut url_str = url.to_str().unwrap();
-
-        match memchr::memmem::find(url_str.as_bytes(), b"//") {
-            Some(scheme_separator_position) => {
-                url_str = &url_str[scheme_separator_position + 2..];
-            },
-            None => return Err(
-                PyValueError::new_err("url is invalid: no scheme")
-            ),
-        };
+        let domain_string = lowercase_domain(domain)?;
+        let (parts, is_private) = self.parse_domain_sections(domain_string.as_str(), include_private)?;
+        let (suffix_part, domain_part, subdomain_part) = output_form.convert_parts(parts)?;
 
-        if let Some(path_separator) = memchr::memchr(b'/', url_str.as_bytes()) {
-            url_str = &url_str[..path_separator];
-        };
+        build_result(py, &suffix_part, &domain_part, &subdomain_part, is_private, None, result_form)
+    }
 
-        if let Some(authentication_separator) = memchr::memchr(b'@', url_str.as_bytes()) {
-            url_str = &url_str[authentication_separator + 1..];
+    /// Scans a url and finds the spans of its host. IP addresses have no suffix,
+    /// so the whole address is the domain part.
+    fn url_parts(
+        &self,
+        url: &str,
+        include_private: bool,
+    ) -> Result<(UrlComponents, UrlHost, DomainSpans), ExtractionError> {
+        let components = scan_url(url)?;
+        let url_host = decode_host(url, &components)?;
+        let host = url_host.as_str(url);
+        let spans = match url_host.kind {
+            HostKind::Domain => self.domain_spans_with_sections(host, include_private)?,
+            HostKind::Ipv4 | HostKind::Ipv6 => DomainSpans::from_parts(host.len(), "", host, ""),
         };
-
-        if let Some(port_separator) = memchr::memchr(b':', url_str.as_bytes()) {
-            url_str = &url_str[..port_separator];
+        let spans = DomainSpans {
+            host_kind: Some(url_host.kind),
+            ..spans
         };
 
-        if url_str.is_empty() {
-            return Err(
-                PyValueError::new_err("url does not contain a domain")
-            );
-        }
+        Ok((components, url_host, spans))
+    }
 
-        if url_str.len() > 255 {
-            return Err(PyValueError::new_err("url is invalid: too long"));
-        }
-        let mut domain_string = unsafe {
-            DomainString::from_str_unchecked(url_str)
-        };
-        domain_string.make_ascii_lowercase();
+    fn url_host_spans(
+        &self,
+        url: &str,
+        include_private: bool,
+    ) -> Result<(UrlHost, DomainSpans), ExtractionError> {
+        let (_, url_host, spans) = self.url_parts(url, include_private)?;
 
-        let (suffix_part, domain_part, subdomain_part) = self.parse_domain_parts(domain_string.as_str())?;
+        Ok((url_host, spans))
+    }
 
-        unsafe {
-            let dict = pyo3::ffi::PyDict_New();
-            for (fraction_key, fraction) in [
-                (intern!(py, "suffix").into_ptr(), suffix_part),
-                (intern!(py, "domain").into_ptr(), domain_part),
-                (intern!(py, "subdomain").into_ptr(), subdomain_part),
-            ] {
-                if !fraction.is_empty() {
-                    let substr = pyo3::ffi::PyUnicode_FromStringAndSize(
-                        fraction.as_ptr() as *const c_char,
-                        fraction.len() as isize,
-                    );
-
-                    pyo3::ffi::PyDict_SetItem(
-                        dict,
-                        fraction_key,
-                        substr,
-                    );
-                    pyo3::ffi::Py_DECREF(substr);
-                } else {
-                    pyo3::ffi::PyDict_SetItem(
-                        dict,
-                        fraction_key,
-                        intern!(py, "").into_ptr(),
-                    );
-                }
-            }
+    fn extract_url(
+        &self,
+        py: Python,
+        url: &str,
+        result_form: ResultForm,
+        output_form: OutputForm,
+        include_private: bool,
+    ) -> PyResult<PyObject> {
+        let (url_host, spans) = self.url_host_spans(url, include_private)?;
+        let host_string = lowercase_domain(url_host.as_str(url))?;
+        let (suffix_part, domain_part, subdomain_part) = output_form.convert_parts(spans.parts(host_string.as_str()))?;
 
-            Ok(pyo3::PyObject::from_owned_ptr(py, dict))
-        }
+        build_result(py, &suffix_part, &domain_part, &subdomain_part, spans.is_private, spans.host_kind, result_form)
     }
-}
 
-fn parse_suffix_list(
-    suffixes_list: &str,
-) -> (AHashMap<String, Suffix>, Vec<String>) {
-    let mut suffixes = AHashMap::new();
-    let mut tld_list = Vec::new();
+    fn extract_part(
+        &self,
+        py: Python,
+        domain: &PyString,
+        part_range: fn(&DomainSpans) -> Range<usize>,
+    ) -> PyResult<Py<PyString>> {
+        let domain_string = lowercase_domain(&domain.to_string_lossy())?;
+        let domain_str = domain_string.as_str();
+        let (suffix_part, domain_part, subdomain_part) = self.parse_domain_parts(domain_str)?;
+        let spans = DomainSpans::from_parts(domain_str.len(), suffix_part, domain_part, subdomain_part);
 
-    for line in suffixes_list.lines().map(
-        |line| line.to_ascii_lowercase()
-    ) {
-        if line.starts_with("//") || line.is_empty() {
-            continue;
-        }
+        Ok(new_part_string(py, &domain_str[part_range(&spans)]))
+    }
 
-        let mut tlds = vec![line.clone()];
-        if !line.is_ascii() {
-            tlds.push(idna::domain_to_ascii(&line).unwrap());
-        }
-        for tld in tlds {
-            tld_list.push(tld.clone());
+    fn extract_part_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        part_range: fn(&DomainSpans) -> Range<usize>,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let domains = collect_batch_strings(domains, error_policy)?;
 
-            let fractions: Vec<String> = tld.rsplit('.').map(
-                |s| s.to_string()
-            ).collect();
-            let mut current_suffix = suffixes.entry(fractions.first().unwrap().to_owned()).or_insert(
-                Suffix {
-                    sub_suffixes: AHashMap::new(),
-                    is_wildcard: false,
-                    sub_blacklist: AHashSet::new(),
-                }
-            );
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| batch_string(domain).and_then(|domain| self.domain_spans(domain)),
+            )
+        );
 
-            for fraction in fractions[1..].iter() {
-                if fraction.starts_with('!') {
-                    current_suffix.sub_blacklist.insert(fraction.strip_prefix('!').unwrap().to_string());
-                } else if fraction == "*" {
-                    current_suffix.is_wildcard = true;
-                } else {
-                    current_suffix = current_suffix.sub_suffixes.entry(fraction.clone()).or_insert(
-                        Suffix {
-                            sub_suffixes: AHashMap::new(),
-                            is_wildcard: false,
-                            sub_blacklist: AHashSet::new(),
-                        }
-                    );
-                }
+        let results = PyList::empty(py);
+        for (domain, domain_spans) in domains.iter().zip(domains_spans) {
+            match domain_spans {
+                Ok(spans) => {
+                    let domain_string = lowercase_domain(batch_string(domain)?)?;
+                    results.append(new_part_string(py, &domain_string.as_str()[part_range(&spans)]))?;
+                },
+                Err(err) => match error_policy {
+                    ErrorPolicy::Raise => return Err(err.into()),
+                    ErrorPolicy::Skip => {},
+                    ErrorPolicy::EmitNone => results.append(py.None())?,
+                },
             }
         }
+
+        Ok(results.to_object(py))
+    }
+
+    fn is_valid(
+        &self,
+        domain: &str,
+    ) -> bool {
+        self.validate(domain).is_ok()
+    }
+
+    /// Whether the domain is valid and is a registered domain itself, without a subdomain
+    fn is_registrable(
+        &self,
+        domain: &str,
+    ) -> bool {
+        self.validate(domain).is_ok() && matches!(self.parse_domain_parts(domain), Ok((_, _, "")))
     }
 
-    (suffixes, tld_list)
+    fn validate(
+        &self,
+        domain: &str,
+    ) -> Result<(), ValidationError> {
+        if domain.is_empty() || domain.len() > 255 {
+            return Err(ValidationError::InvalidLength);
+        }
+
+        // IDNA processing leaves ASCII letters, digits and hyphens as they are, so it can only
+        // reject a domain if it holds a non ASCII character or a punycode label
+        let mut needs_idna = !domain.is_ascii();
+        for fraction in domain.split('.') {
+            if fraction.len() > 63 || fraction.is_empty() {
+                return Err(ValidationError::InvalidLabelLength);
+            }
+            if fraction.starts_with('-') || fraction.ends_with('-') {
+                return Err(ValidationError::InvalidHyphen);
+            }
+
+            if needs_idna {
+                if !fraction.chars().all(|ch| ch.is_alphanumeric() || ch == '-') {
+                    return Err(ValidationError::InvalidCharacter);
+                }
+            } else {
+                if !fraction.bytes().all(|byte| byte.is_ascii_alphanumeric() || byte == b'-') {
+                    return Err(ValidationError::InvalidCharacter);
+                }
+                needs_idna |= fraction.len() >= 4 && fraction[..4].eq_ignore_ascii_case("xn--");
+            }
+        }
+
+        let domain_string = lowercase_domain(domain).map_err(|_| ValidationError::InvalidLength)?;
+        match self.parse_domain_parts(domain_string.as_str()) {
+            Ok((suffix_part, domain_part, _subdomain_part)) if !suffix_part.is_empty() && !domain_part.is_empty() => {},
+            _ => return Err(ValidationError::NotRegistrable),
+        }
+
+        // domain_to_unicode runs the same processing as domain_to_ascii, hence it can not fail alone
+        if needs_idna && idna::domain_to_ascii(domain_string.as_str()).is_err() {
+            return Err(ValidationError::InvalidIdna);
+        }
+
+        Ok(())
+    }
+}
+
+#[pymethods]
+impl DomainExtractor {
+    #[new]
+    #[args(suffix_list = "None", cache_size = "0")]
+    fn new(
+        suffix_list: Option<&str>,
+        cache_size: usize,
+    ) -> Self {
+        DomainExtractor::from_suffix_trie(SuffixTrie::from_suffix_list(suffix_list), cache_size)
+    }
+
+    #[staticmethod]
+    #[args(cache_size = "0")]
+    fn from_compiled(
+        compiled: &[u8],
+        cache_size: usize,
+    ) -> PyResult<Self> {
+        let suffix_trie = SuffixTrie::from_compiled_data(SuffixListData::Owned(compiled.to_vec()))?;
+
+        Ok(DomainExtractor::from_suffix_trie(suffix_trie, cache_size))
+    }
+
+    #[staticmethod]
+    #[args(cache_size = "0")]
+    fn from_compiled_file(
+        path: PathBuf,
+        cache_size: usize,
+    ) -> PyResult<Self> {
+        let suffix_trie = SuffixTrie::from_compiled_file(&File::open(path)?)?;
+
+        Ok(DomainExtractor::from_suffix_trie(suffix_trie, cache_size))
+    }
+
+    /// Pickles the extractor as its compiled suffix list, so unpickling it costs a copy and a bounds check
+    /// rather than parsing the list again. The bundled list is not pickled at all.
+    fn __reduce__(
+        &self,
+        py: Python,
+    ) -> PyResult<(PyObject, PyObject, PyObject)> {
+        let suffix_trie = self.suffix_trie();
+        let compiled = if suffix_trie.is_bundled() {
+            py.None()
+        } else {
+            PyBytes::new(py, suffix_trie.suffix_list.as_bytes()).to_object(py)
+        };
+        let cache_size = self.results_cache.as_ref().map_or(0, |results_cache| results_cache.lock().unwrap().capacity());
+
+        Ok(
+            (
+                py.get_type::<DomainExtractor>().to_object(py),
+                (py.None(), cache_size).to_object(py),
+                compiled,
+            )
+        )
+    }
+
+    fn __setstate__(
+        &self,
+        py: Python,
+        compiled: Option<&[u8]>,
+    ) -> PyResult<()> {
+        if let Some(compiled) = compiled {
+            let compiled = compiled.to_vec();
+            let suffix_trie = py.allow_threads(|| SuffixTrie::from_compiled_data(SuffixListData::Owned(compiled)))?;
+            self.replace_suffix_trie(py, suffix_trie);
+        }
+
+        Ok(())
+    }
+
+    fn cache_info(
+        &self,
+        py: Python,
+    ) -> PyResult<PyObject> {
+        let dict = PyDict::new(py);
+        let (hits, misses, evictions, max_size, size) = match &self.results_cache {
+            Some(results_cache) => {
+                let results_cache = results_cache.lock().unwrap();
+
+                (results_cache.hits, results_cache.misses, results_cache.evictions, results_cache.capacity(), results_cache.len())
+            },
+            None => (0, 0, 0, 0, 0),
+        };
+        dict.set_item(intern!(py, "hits"), hits)?;
+        dict.set_item(intern!(py, "misses"), misses)?;
+        dict.set_item(intern!(py, "evictions"), evictions)?;
+        dict.set_item(intern!(py, "max_size"), max_size)?;
+        dict.set_item(intern!(py, "size"), size)?;
+
+        Ok(dict.to_object(py))
+    }
+
+    fn cache_clear(
+        &self,
+    ) {
+        if let Some(results_cache) = &self.results_cache {
+            let mut results_cache = results_cache.lock().unwrap();
+            results_cache.clear();
+            results_cache.hits = 0;
+            results_cache.misses = 0;
+            results_cache.evictions = 0;
+        }
+    }
+
+    fn to_compiled(
+        &self,
+        py: Python,
+    ) -> PyObject {
+        self.with_suffix_trie(|suffix_trie| PyBytes::new(py, suffix_trie.suffix_list.as_bytes()).to_object(py))
+    }
+
+    #[args(suffix_list_data = "None")]
+    fn reload(
+        &self,
+        py: Python,
+        suffix_list_data: Option<&str>,
+    ) {
+        let suffix_trie = py.allow_threads(|| SuffixTrie::from_suffix_list(suffix_list_data));
+
+        self.replace_suffix_trie(py, suffix_trie);
+    }
+
+    fn update_from_file(
+        &self,
+        py: Python,
+        path: PathBuf,
+    ) -> PyResult<()> {
+        let suffix_trie = py.allow_threads(|| SuffixTrie::from_file(&path))?;
+        self.replace_suffix_trie(py, suffix_trie);
+
+        Ok(())
+    }
+
+    #[args(compact = "false", output_form = "\"as_is\"", include_private = "true", return_bytes = "false")]
+    fn extract(
+        &self,
+        py: Python,
+        domain: &PyAny,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+        return_bytes: bool,
+    ) -> PyResult<PyObject> {
+        let result_form = ResultForm::new(compact, return_bytes)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let domain = input_string(domain)?;
+
+        if let Some(results_cache) = &self.results_cache {
+            if output_form == OutputForm::AsIs && include_private && result_form != ResultForm::BytesDict {
+                let extract_result = self.extract_cached(py, &domain, results_cache)?;
+
+                return if compact {
+                    Ok(extract_result.into_py(py))
+                } else {
+                    extract_result.borrow(py).as_dict(py)
+                };
+            }
+        }
+
+        self.with_suffix_trie(|suffix_trie| suffix_trie.extract_domain(py, &domain, result_form, output_form, include_private))
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1", compact = "false", output_form = "\"as_is\"", include_private = "true")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let domains = collect_batch_strings(domains, error_policy)?;
+
+        let suffix_trie = self.suffix_trie();
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| batch_string(domain).and_then(
+                    |domain| suffix_trie.domain_spans_with_sections(domain, include_private)
+                ),
+            )
+        );
+
+        build_results_list(
+            py,
+            error_policy,
+            ResultForm::new(compact, false)?,
+            output_form,
+            domains.iter().zip(domains_spans).map(
+                |(domain, domain_spans)| domain_spans.and_then(|spans| Ok((batch_string(domain)?, spans)))
+            ),
+        )
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1", compact = "false", output_form = "\"as_is\"", include_private = "true")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_many_async(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let result_form = ResultForm::new(compact, false)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let domains: Vec<Option<String>> = collect_batch_strings(domains, error_policy)?.into_iter().map(
+            |domain| domain.map(Cow::into_owned)
+        ).collect();
+
+        let suffix_trie = self.suffix_trie();
+        spawn_future(
+            py,
+            move || {
+                let domains_spans = parallel_map(
+                    &domains,
+                    num_threads,
+                    |domain| batch_string(domain).and_then(
+                        |domain| suffix_trie.domain_spans_with_sections(domain, include_private)
+                    ),
+                );
+
+                (domains, domains_spans)
+            },
+            move |py, (domains, domains_spans)| build_results_list(
+                py,
+                error_policy,
+                result_form,
+                output_form,
+                domains.iter().zip(domains_spans).map(
+                    |(domain, domain_spans)| domain_spans.and_then(|spans| Ok((batch_string(domain)?, spans)))
+                ),
+            ),
+        )
+    }
+
+    fn extract_spans(
+        &self,
+        domain: &PyString,
+    ) -> PyResult<(usize, usize, usize, usize)> {
+        let domain = domain.to_string_lossy();
+        let spans = self.with_suffix_trie(|suffix_trie| suffix_trie.domain_spans(&domain))?;
+
+        Ok(spans.char_offsets(&domain))
+    }
+
+    #[args(num_threads = "1")]
+    fn extract_spans_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        out: &PyAny,
+        num_threads: usize,
+    ) -> PyResult<usize> {
+        let domains = collect_strings(domains)?;
+        let out_buffer = PyBuffer::<i32>::get(out)?;
+        if out_buffer.readonly() || !out_buffer.is_c_contiguous() {
+            return Err(PyValueError::new_err("out must be a writable C-contiguous int32 buffer"));
+        }
+        if out_buffer.item_count() < domains.len() * 4 {
+            return Err(PyValueError::new_err("out must hold at least 4 items per domain"));
+        }
+
+        let suffix_trie = self.suffix_trie();
+        let domains_offsets = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| match suffix_trie.domain_spans(domain) {
+                    Ok(spans) => {
+                        let (subdomain_end, domain_start, domain_end, suffix_start) = spans.char_offsets(domain);
+
+                        [subdomain_end as i32, domain_start as i32, domain_end as i32, suffix_start as i32]
+                    },
+                    Err(_) => [-1; 4],
+                },
+            )
+        );
+
+        let out_slice = unsafe {
+            std::slice::from_raw_parts_mut(out_buffer.buf_ptr() as *mut i32, domains.len() * 4)
+        };
+        for (out_offsets, domain_offsets) in out_slice.chunks_exact_mut(4).zip(domains_offsets) {
+            out_offsets.copy_from_slice(&domain_offsets);
+        }
+
+        Ok(domains.len())
+    }
+
+    fn registered_domain(
+        &self,
+        py: Python,
+        domain: &PyString,
+    ) -> PyResult<Py<PyString>> {
+        self.with_suffix_trie(|suffix_trie| suffix_trie.extract_part(py, domain, DomainSpans::registered_domain_range))
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1")]
+    fn registered_domain_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+    ) -> PyResult<PyObject> {
+        self.suffix_trie().extract_part_many(py, domains, error_policy, num_threads, DomainSpans::registered_domain_range)
+    }
+
+    fn public_suffix(
+        &self,
+        py: Python,
+        domain: &PyString,
+    ) -> PyResult<Py<PyString>> {
+        self.with_suffix_trie(|suffix_trie| suffix_trie.extract_part(py, domain, DomainSpans::suffix_range))
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1")]
+    fn public_suffix_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+    ) -> PyResult<PyObject> {
+        self.suffix_trie().extract_part_many(py, domains, error_policy, num_threads, DomainSpans::suffix_range)
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1", registered_domain = "false")]
+    fn extract_columns(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        registered_domain: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let domains = collect_batch_strings(domains, error_policy)?;
+
+        let suffix_trie = self.suffix_trie();
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| batch_string(domain).and_then(|domain| suffix_trie.domain_spans(domain)),
+            )
+        );
+
+        build_columns(
+            py,
+            error_policy,
+            registered_domain,
+            domains.iter().zip(domains_spans).map(
+                |(domain, domain_spans)| Some(domain_spans.and_then(|spans| Ok((batch_string(domain)?, spans))))
+            ),
+        )
+    }
+
+    #[args(validity = "None", error_policy = "\"raise\"", num_threads = "1", registered_domain = "false")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_columns_from_arrow(
+        &self,
+        py: Python,
+        offsets: &PyAny,
+        data: &PyAny,
+        validity: Option<&PyAny>,
+        error_policy: &str,
+        num_threads: usize,
+        registered_domain: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let offsets_buffer = PyBuffer::<u8>::get(offsets)?;
+        let data_buffer = PyBuffer::<u8>::get(data)?;
+        let validity_buffer = validity.map(PyBuffer::<u8>::get).transpose()?;
+
+        let domains = read_arrow_strings(
+            buffer_as_bytes(&offsets_buffer)?,
+            buffer_as_bytes(&data_buffer)?,
+            validity_buffer.as_ref().map(buffer_as_bytes).transpose()?,
+        )?;
+
+        let suffix_trie = self.suffix_trie();
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| domain.map(|domain| suffix_trie.domain_spans(domain)),
+            )
+        );
+
+        build_columns(
+            py,
+            error_policy,
+            registered_domain,
+            domains.iter().zip(domains_spans).map(
+                |(domain, domain_spans)| domain_spans.map(
+                    |domain_spans| domain_spans.map(|spans| (domain.unwrap(), spans))
+                )
+            ),
+        )
+    }
+
+    #[args(separator = "&b\"\\n\"[..]", offsets = "None", error_policy = "\"raise\"", num_threads = "1", compact = "false", return_bytes = "false")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_buffer(
+        &self,
+        py: Python,
+        buffer: PyBuffer<u8>,
+        separator: &[u8],
+        offsets: Option<PyBuffer<u8>>,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        return_bytes: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let result_form = ResultForm::new(compact, return_bytes)?;
+        let data = buffer_as_bytes(&buffer)?;
+
+        let items: Vec<&[u8]> = match &offsets {
+            Some(offsets) => read_offsets(buffer_as_bytes(offsets)?, data.len())?.into_iter().map(
+                |range| &data[range]
+            ).collect(),
+            None => match separator {
+                [separator] => split_buffer(data, *separator),
+                _ => return Err(PyValueError::new_err("separator must be a single byte")),
+            },
+        };
+
+        let suffix_trie = self.suffix_trie();
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &items,
+                num_threads,
+                |item| line_spans(&suffix_trie, item),
+            )
+        );
+
+        build_results_list(py, error_policy, result_form, OutputForm::AsIs, domains_spans.into_iter())
+    }
+
+    #[args(offset = "0", compact = "false", return_bytes = "false")]
+    fn extract_wire_name(
+        &self,
+        py: Python,
+        message: PyBuffer<u8>,
+        offset: usize,
+        compact: bool,
+        return_bytes: bool,
+    ) -> PyResult<PyObject> {
+        let result_form = ResultForm::new(compact, return_bytes)?;
+        let name = decode_wire_name(buffer_as_bytes(&message)?, offset)?;
+
+        self.with_suffix_trie(|suffix_trie| suffix_trie.extract_domain(py, &name, result_form, OutputForm::AsIs, true))
+    }
+
+    #[args(offsets = "None", error_policy = "\"raise\"", num_threads = "1", compact = "false", return_bytes = "false")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_wire_names(
+        &self,
+        py: Python,
+        message: PyBuffer<u8>,
+        offsets: Option<Vec<usize>>,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        return_bytes: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let result_form = ResultForm::new(compact, return_bytes)?;
+        let message = buffer_as_bytes(&message)?;
+        let offsets = match offsets {
+            Some(offsets) => offsets,
+            None => wire_name_offsets(message)?,
+        };
+
+        let suffix_trie = self.suffix_trie();
+        let names_spans = py.allow_threads(
+            || parallel_map(
+                &offsets,
+                num_threads,
+                |&offset| -> Result<(String, DomainSpans), ExtractionError> {
+                    let name = decode_wire_name(message, offset)?;
+                    let spans = suffix_trie.domain_spans(&name)?;
+
+                    Ok((name, spans))
+                },
+            )
+        );
+
+        build_results_list(
+            py,
+            error_policy,
+            result_form,
+            OutputForm::AsIs,
+            names_spans.iter().map(
+                |name_spans| match name_spans {
+                    Ok((name, spans)) => Ok((name.as_str(), *spans)),
+                    Err(err) => Err(*err),
+                }
+            ),
+        )
+    }
+
+    fn is_valid_domain(
+        &self,
+        py: Python,
+        domain: &PyAny,
+    ) -> PyResult<bool> {
+        match input_string(domain) {
+            Ok(domain) => Ok(self.with_suffix_trie(|suffix_trie| suffix_trie.is_valid(&domain))),
+            Err(err) if err.is_instance_of::<PyValueError>(py) => Ok(false),
+            Err(err) => Err(err),
+        }
+    }
+
+    #[args(num_threads = "1")]
+    fn is_valid_domain_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        num_threads: usize,
+    ) -> PyResult<Vec<bool>> {
+        let domains = collect_strings(domains)?;
+        let suffix_trie = self.suffix_trie();
+
+        Ok(
+            py.allow_threads(
+                || parallel_map(
+                    &domains,
+                    num_threads,
+                    |domain| suffix_trie.is_valid(domain),
+                )
+            )
+        )
+    }
+
+    fn validate_domain(
+        &self,
+        domain: &PyString,
+    ) -> Option<&'static str> {
+        self.with_suffix_trie(|suffix_trie| suffix_trie.validate(&domain.to_string_lossy())).err().map(|err| err.code())
+    }
+
+    #[args(num_threads = "1", reasons = "false")]
+    fn validate_many(
+        &self,
+        py: Python,
+        domains: &PyAny,
+        num_threads: usize,
+        reasons: bool,
+    ) -> PyResult<PyObject> {
+        let domains = collect_strings(domains)?;
+        let suffix_trie = self.suffix_trie();
+
+        let validations = py.allow_threads(
+            || parallel_map(
+                &domains,
+                num_threads,
+                |domain| suffix_trie.validate(domain),
+            )
+        );
+
+        if reasons {
+            let codes: Vec<Option<&str>> = validations.iter().map(|validation| validation.err().map(|err| err.code())).collect();
+
+            Ok(codes.to_object(py))
+        } else {
+            let valid_bytes: Vec<u8> = validations.iter().map(|validation| validation.is_ok() as u8).collect();
+
+            Ok(PyBytes::new(py, &valid_bytes).to_object(py))
+        }
+    }
+
+    #[args(kinds = "None", batch_size = "65536", num_threads = "1")]
+    fn lookalikes(
+        &self,
+        domain: &PyString,
+        kinds: Option<Vec<&str>>,
+        batch_size: usize,
+        num_threads: usize,
+    ) -> PyResult<LookalikeIterator> {
+        let kinds = match kinds {
+            Some(kinds) => kinds.into_iter().map(LookalikeKind::parse).collect::<PyResult<Vec<_>>>()?,
+            None => LookalikeKind::ALL.to_vec(),
+        };
+
+        let suffix_trie = self.suffix_trie();
+        let domain_string = lowercase_domain(&domain.to_string_lossy())?;
+        let (suffix_part, domain_part, _subdomain_part) = suffix_trie.parse_domain_parts(domain_string.as_str())?;
+        if suffix_part.is_empty() || domain_part.is_empty() {
+            return Err(PyValueError::new_err("domain has no registered domain to permute"));
+        }
+
+        let suffixes = if kinds.contains(&LookalikeKind::TldSwap) { suffix_trie.suffix_list.tld_list() } else { Vec::new() };
+        let candidates = generate_lookalikes(domain_part, suffix_part, &suffixes, &kinds);
+
+        Ok(
+            LookalikeIterator {
+                suffix_trie,
+                candidates,
+                position: 0,
+                batch_size: batch_size.max(1),
+                num_threads,
+            }
+        )
+    }
+
+    fn get_tld_list(
+        &self,
+    ) -> Vec<String> {
+        self.with_suffix_trie(|suffix_trie| suffix_trie.suffix_list.tld_list())
+    }
+
+    #[args(compact = "false", output_form = "\"as_is\"", include_private = "true", return_bytes = "false")]
+    fn extract_from_url(
+        &self,
+        py: Python,
+        url: &PyAny,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+        return_bytes: bool,
+    ) -> PyResult<PyObject> {
+        let result_form = ResultForm::new(compact, return_bytes)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let url = input_string(url)?;
+
+        self.with_suffix_trie(|suffix_trie| suffix_trie.extract_url(py, &url, result_form, output_form, include_private))
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1", compact = "false", output_form = "\"as_is\"", include_private = "true")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_from_url_many(
+        &self,
+        py: Python,
+        urls: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let urls = collect_batch_strings(urls, error_policy)?;
+
+        let suffix_trie = self.suffix_trie();
+        let hosts_spans = py.allow_threads(
+            || parallel_map(
+                &urls,
+                num_threads,
+                |url| batch_string(url).and_then(|url| suffix_trie.url_host_spans(url, include_private)),
+            )
+        );
+
+        build_results_list(
+            py,
+            error_policy,
+            ResultForm::new(compact, false)?,
+            output_form,
+            urls.iter().zip(&hosts_spans).map(
+                |(url, host_spans)| match host_spans {
+                    Ok((url_host, spans)) => Ok((url_host.as_str(batch_string(url)?), *spans)),
+                    Err(err) => Err(*err),
+                }
+            ),
+        )
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1", compact = "false", output_form = "\"as_is\"", include_private = "true")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_from_url_many_async(
+        &self,
+        py: Python,
+        urls: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+        output_form: &str,
+        include_private: bool,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let result_form = ResultForm::new(compact, false)?;
+        let output_form = OutputForm::parse(output_form)?;
+        let urls: Vec<Option<String>> = collect_batch_strings(urls, error_policy)?.into_iter().map(
+            |url| url.map(Cow::into_owned)
+        ).collect();
+
+        let suffix_trie = self.suffix_trie();
+        spawn_future(
+            py,
+            move || {
+                let hosts_spans = parallel_map(
+                    &urls,
+                    num_threads,
+                    |url| batch_string(url).and_then(|url| suffix_trie.url_host_spans(url, include_private)),
+                );
+
+                (urls, hosts_spans)
+            },
+            move |py, (urls, hosts_spans)| build_results_list(
+                py,
+                error_policy,
+                result_form,
+                output_form,
+                urls.iter().zip(&hosts_spans).map(
+                    |(url, host_spans)| match host_spans {
+                        Ok((url_host, spans)) => Ok((url_host.as_str(batch_string(url)?), *spans)),
+                        Err(err) => Err(*err),
+                    }
+                ),
+            ),
+        )
+    }
+
+    fn extract_url_parts(
+        &self,
+        py: Python,
+        url: &PyString,
+    ) -> PyResult<PyObject> {
+        let url = url.to_str()?;
+        let (components, url_host, spans) = self.with_suffix_trie(|suffix_trie| suffix_trie.url_parts(url, true))?;
+
+        build_url_parts_dict(py, url, &components, &url_host, &spans)
+    }
+
+    #[args(error_policy = "\"raise\"", num_threads = "1")]
+    fn extract_url_parts_many(
+        &self,
+        py: Python,
+        urls: &PyAny,
+        error_policy: &str,
+        num_threads: usize,
+    ) -> PyResult<PyObject> {
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let urls = collect_batch_strings(urls, error_policy)?;
+
+        let suffix_trie = self.suffix_trie();
+        let urls_parts = py.allow_threads(
+            || parallel_map(
+                &urls,
+                num_threads,
+                |url| batch_string(url).and_then(|url| suffix_trie.url_parts(url, true)),
+            )
+        );
+
+        let results = PyList::empty(py);
+        for (url, url_parts) in urls.iter().zip(urls_parts) {
+            match url_parts {
+                Ok((components, url_host, spans)) => {
+                    let url = batch_string(url)?;
+                    results.append(build_url_parts_dict(py, url, &components, &url_host, &spans)?)?;
+                },
+                Err(err) => match error_policy {
+                    ErrorPolicy::Raise => return Err(err.into()),
+                    ErrorPolicy::Skip => {},
+                    ErrorPolicy::EmitNone => results.append(py.None())?,
+                },
+            }
+        }
+
+        Ok(results.to_object(py))
+    }
+
+    #[args(chunk_size = "65536", error_policy = "\"raise\"", num_threads = "1", compact = "false")]
+    fn iter_file(
+        &self,
+        path: PathBuf,
+        chunk_size: usize,
+        error_policy: &str,
+        num_threads: usize,
+        compact: bool,
+    ) -> PyResult<FileExtractionIterator> {
+        Ok(
+            FileExtractionIterator {
+                suffix_trie: self.suffix_trie(),
+                input: map_input_file(&path)?,
+                position: 0,
+                chunk_size: chunk_size.max(1),
+                error_policy: ErrorPolicy::parse(error_policy)?,
+                num_threads,
+                result_form: ResultForm::new(compact, false)?,
+            }
+        )
+    }
+
+    #[args(output_format = "\"tsv\"", error_policy = "\"raise\"", chunk_size = "65536", num_threads = "1")]
+    #[allow(clippy::too_many_arguments)]
+    fn extract_file(
+        &self,
+        py: Python,
+        path: PathBuf,
+        output_path: PathBuf,
+        output_format: &str,
+        error_policy: &str,
+        chunk_size: usize,
+        num_threads: usize,
+    ) -> PyResult<usize> {
+        let output_format = OutputFormat::parse(output_format)?;
+        let error_policy = ErrorPolicy::parse(error_policy)?;
+        let suffix_trie = self.suffix_trie();
+
+        py.allow_threads(
+            || file_extraction::extract_file(
+                &suffix_trie,
+                &path,
+                &output_path,
+                output_format,
+                error_policy,
+                chunk_size,
+                num_threads,
+            )
+        )
+    }
+}
+
+/// Yields the results of a newline delimited file, one list of up to chunk_size results at a time
+#[pyclass]
+struct FileExtractionIterator {
+    suffix_trie: Arc<SuffixTrie>,
+    input: Option<memmap2::Mmap>,
+    position: usize,
+    chunk_size: usize,
+    error_policy: ErrorPolicy,
+    num_threads: usize,
+    result_form: ResultForm,
+}
+
+#[pymethods]
+impl FileExtractionIterator {
+    fn __iter__(
+        slf: PyRef<Self>,
+    ) -> PyRef<Self> {
+        slf
+    }
+
+    fn __next__(
+        mut slf: PyRefMut<Self>,
+        py: Python,
+    ) -> PyResult<Option<PyObject>> {
+        let iterator = &mut *slf;
+        let mut lines = Lines::new(iterator.input.as_deref().unwrap_or_default(), iterator.position);
+        let chunk: Vec<&[u8]> = lines.by_ref().take(iterator.chunk_size).collect();
+        if chunk.is_empty() {
+            // Unmapping the file as soon as it is read, so it can be removed or replaced
+            iterator.input = None;
+
+            return Ok(None);
+        }
+        // Moving on before the results are built, a chunk that raises is not read again
+        iterator.position = lines.position();
+
+        let suffix_trie = &iterator.suffix_trie;
+        let domains_spans = py.allow_threads(
+            || parallel_map(
+                &chunk,
+                iterator.num_threads,
+                |line| line_spans(suffix_trie, line),
+            )
+        );
+
+        let results = build_results_list(py, iterator.error_policy, iterator.result_form, OutputForm::AsIs, domains_spans.into_iter())?;
+
+        Ok(Some(results))
+    }
+}
+
+/// Byte offsets of the parts of a domain, so that
+/// `domain[..subdomain_end]`, `domain[domain_start..domain_end]` and `domain[suffix_start..suffix_end]`
+/// are the subdomain, the domain and the suffix respectively. is_private tells whether the suffix
+/// comes from the private section of the list. host_kind is the kind of the host of a url,
+/// and None for a domain.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+struct DomainSpans {
+    subdomain_end: usize,
+    domain_start: usize,
+    domain_end: usize,
+    suffix_start: usize,
+    suffix_end: usize,
+    is_private: bool,
+    host_kind: Option<HostKind>,
+}
+
+impl DomainSpans {
+    fn from_parts(
+        domain_len: usize,
+        suffix_part: &str,
+        domain_part: &str,
+        subdomain_part: &str,
+    ) -> Self {
+        // The parts are always laid out as "subdomain.domain.suffix" so their lengths are enough
+        let subdomain_end = subdomain_part.len();
+        let domain_start = if subdomain_part.is_empty() { 0 } else { subdomain_end + 1 };
+
+        DomainSpans {
+            subdomain_end,
+            domain_start,
+            domain_end: domain_start + domain_part.len(),
+            suffix_start: domain_len - suffix_part.len(),
+            suffix_end: domain_len,
+            is_private: false,
+            host_kind: None,
+        }
+    }
+
+    fn suffix_range(
+        &self,
+    ) -> Range<usize> {
+        self.suffix_start..self.suffix_end
+    }
+
+    fn domain_range(
+        &self,
+    ) -> Range<usize> {
+        self.domain_start..self.domain_end
+    }
+
+    fn subdomain_range(
+        &self,
+    ) -> Range<usize> {
+        0..self.subdomain_end
+    }
+
+    /// The offsets as Python str indices, which count code points rather than bytes
+    fn char_offsets(
+        &self,
+        domain: &str,
+    ) -> (usize, usize, usize, usize) {
+        let to_char_offset = |byte_offset: usize| {
+            if domain.is_ascii() {
+                byte_offset
+            } else {
+                domain[..byte_offset].chars().count()
+            }
+        };
+
+        (
+            to_char_offset(self.subdomain_end),
+            to_char_offset(self.domain_start),
+            to_char_offset(self.domain_end),
+            to_char_offset(self.suffix_start),
+        )
+    }
+
+    /// The range of "domain.suffix", empty when either of them is missing
+    fn registered_domain_range(
+        &self,
+    ) -> Range<usize> {
+        if self.domain_start == self.domain_end || self.suffix_start == self.suffix_end {
+            self.suffix_end..self.suffix_end
+        } else {
+            self.domain_start..self.suffix_end
+        }
+    }
+
+    fn parts<'a>(
+        &self,
+        domain: &'a str,
+    ) -> (&'a str, &'a str, &'a str) {
+        (
+            &domain[self.suffix_range()],
+            &domain[self.domain_range()],
+            &domain[self.subdomain_range()],
+        )
+    }
+}
+
+fn lowercase_domain(
+    domain: &str,
+) -> Result<DomainString, ExtractionError> {
+    // DomainString is a fixed 255 bytes buffer, hence the length is checked in bytes
+    if domain.len() > 255 {
+        return Err(ExtractionError::InvalidDomain);
+    }
+
+    let mut domain_string = unsafe {
+        DomainString::from_str_unchecked(domain)
+    };
+    domain_string.make_ascii_lowercase();
+
+    Ok(domain_string)
+}
+
+/// Reads a str, or the UTF-8 encoded domain of a bytes-like object. bytes are read in place,
+/// the other buffers are copied once.
+fn input_string(
+    input: &PyAny,
+) -> PyResult<Cow<'_, str>> {
+    if let Ok(string) = input.downcast::<PyString>() {
+        return Ok(string.to_string_lossy());
+    }
+    if let Ok(bytes) = input.downcast::<PyBytes>() {
+        return std::str::from_utf8(bytes.as_bytes()).map(Cow::Borrowed).map_err(|_| ExtractionError::InvalidDomain.into());
+    }
+
+    let buffer = PyBuffer::<u8>::get(input)?;
+    let data = buffer.to_vec(input.py())?;
+
+    String::from_utf8(data).map(Cow::Owned).map_err(|_| ExtractionError::InvalidDomain.into())
+}
+
+fn collect_strings(
+    inputs: &PyAny,
+) -> PyResult<Vec<Cow<'_, str>>> {
+    let mut strings = Vec::with_capacity(inputs.len().unwrap_or(0));
+    for input in inputs.iter()? {
+        strings.push(input?.downcast::<PyString>()?.to_string_lossy());
+    }
+
+    Ok(strings)
+}
+
+/// Reads the strings of a batch taking an error_policy. Items that are not str raise TypeError under
+/// 'raise', are dropped under 'skip' and are kept as None under 'none', so they come out as None.
+fn collect_batch_strings(
+    inputs: &PyAny,
+    error_policy: ErrorPolicy,
+) -> PyResult<Vec<Option<Cow<'_, str>>>> {
+    let mut strings = Vec::with_capacity(inputs.len().unwrap_or(0));
+    for input in inputs.iter()? {
+        match input?.downcast::<PyString>() {
+            Ok(string) => strings.push(Some(string.to_string_lossy())),
+            Err(err) => match error_policy {
+                ErrorPolicy::Raise => return Err(err.into()),
+                ErrorPolicy::Skip => {},
+                ErrorPolicy::EmitNone => strings.push(None),
+            },
+        }
+    }
+
+    Ok(strings)
+}
+
+/// The string of a batch item, an item that was not a str is an invalid domain
+fn batch_string<S: AsRef<str>>(
+    item: &Option<S>,
+) -> Result<&str, ExtractionError> {
+    item.as_ref().map(AsRef::as_ref).ok_or(ExtractionError::InvalidDomain)
+}
+
+/// Maps every item on up to num_threads native threads, keeping the original order.
+/// num_threads of 0 uses all the available cores.
+fn parallel_map<T, R, F>(
+    items: &[T],
+    num_threads: usize,
+    f: F,
+) -> Vec<R>
+where
+    T: Sync,
+    R: Send,
+    F: Fn(&T) -> R + Sync,
+{
+    let num_threads = if num_threads == 0 {
+        std::thread::available_parallelism().map_or(1, |parallelism| parallelism.get())
+    } else {
+        num_threads
+    };
+    let num_threads = num_threads.min(items.len() / MIN_ITEMS_PER_THREAD).max(1);
+
+    if num_threads == 1 {
+        return items.iter().map(&f).collect();
+    }
+
+    let chunk_size = items.len().div_ceil(num_threads);
+    std::thread::scope(
+        |scope| {
+            let f = &f;
+            let handles: Vec<_> = items.chunks(chunk_size).map(
+                |chunk| scope.spawn(move || chunk.iter().map(f).collect::<Vec<R>>())
+            ).collect();
+
+            let mut results = Vec::with_capacity(items.len());
+            for handle in handles {
+                results.extend(handle.join().unwrap());
+            }
+
+            results
+        }
+    )
+}
+
+fn build_results_list<'a>(
+    py: Python,
+    error_policy: ErrorPolicy,
+    result_form: ResultForm,
+    output_form: OutputForm,
+    domains_spans: impl Iterator<Item = Result<(&'a str, DomainSpans), ExtractionError>>,
+) -> PyResult<PyObject> {
+    let results = PyList::empty(py);
+
+    for domain_spans in domains_spans {
+        let domain_string;
+        let parts = match domain_spans {
+            Ok((domain, spans)) => {
+                domain_string = lowercase_domain(domain)?;
+
+                output_form.convert_parts(spans.parts(domain_string.as_str())).map(|parts| (parts, spans))
+            },
+            Err(err) => Err(err),
+        };
+
+        match parts {
+            Ok(((suffix_part, domain_part, subdomain_part), spans)) => {
+                results.append(build_result(py, &suffix_part, &domain_part, &subdomain_part, spans.is_private, spans.host_kind, result_form)?)?;
+            },
+            Err(err) => match error_policy {
+                ErrorPolicy::Raise => return Err(err.into()),
+                ErrorPolicy::Skip => {},
+                ErrorPolicy::EmitNone => results.append(py.None())?,
+            },
+        }
+    }
+
+    Ok(results.to_object(py))
+}
+
+fn buffer_as_bytes(
+    buffer: &PyBuffer<u8>,
+) -> PyResult<&[u8]> {
+    if !buffer.is_c_contiguous() {
+        return Err(PyValueError::new_err("buffer must be C-contiguous"));
+    }
+
+    Ok(
+        unsafe {
+            std::slice::from_raw_parts(buffer.buf_ptr() as *const u8, buffer.len_bytes())
+        }
+    )
+}
+
+/// Reads the byte ranges of the items of a buffer of n + 1 int64 offsets, the way Arrow lays out its strings
+fn read_offsets(
+    offsets: &[u8],
+    data_length: usize,
+) -> PyResult<Vec<Range<usize>>> {
+    let offsets_chunks = offsets.chunks_exact(8);
+    if offsets.is_empty() || !offsets_chunks.remainder().is_empty() {
+        return Err(PyValueError::new_err("offsets must be a buffer of int64 values"));
+    }
+    let offsets: Vec<i64> = offsets_chunks.map(
+        |offset| i64::from_ne_bytes(offset.try_into().unwrap())
+    ).collect();
+
+    let mut ranges = Vec::with_capacity(offsets.len() - 1);
+    for bounds in offsets.windows(2) {
+        let (start, end) = (bounds[0], bounds[1]);
+        if start < 0 || end < start || end as usize > data_length {
+            return Err(PyValueError::new_err("offsets are out of the data bounds"));
+        }
+        ranges.push(start as usize..end as usize);
+    }
+
+    Ok(ranges)
+}
+
+/// Splits data on a separator byte. A trailing separator does not start another item.
+fn split_buffer(
+    data: &[u8],
+    separator: u8,
+) -> Vec<&[u8]> {
+    let mut items = Vec::new();
+    let mut start = 0;
+    for separator_index in memchr::memchr_iter(separator, data) {
+        items.push(&data[start..separator_index]);
+        start = separator_index + 1;
+    }
+    if start < data.len() {
+        items.push(&data[start..]);
+    }
+
+    items
+}
+
+/// Reads the strings of an Arrow large_string array, None stands for a null entry
+fn read_arrow_strings<'a>(
+    offsets: &[u8],
+    data: &'a [u8],
+    validity: Option<&[u8]>,
+) -> PyResult<Vec<Option<&'a str>>> {
+    let ranges = read_offsets(offsets, data.len())?;
+    let length = ranges.len();
+
+    if let Some(validity) = validity {
+        if validity.len() < length.div_ceil(8) {
+            return Err(PyValueError::new_err("validity bitmap is shorter than the array"));
+        }
+    }
+
+    let mut strings = Vec::with_capacity(length);
+    for (index, range) in ranges.into_iter().enumerate() {
+        if let Some(validity) = validity {
+            if validity[index / 8] >> (index % 8) & 1 == 0 {
+                strings.push(None);
+                continue;
+            }
+        }
+
+        match std::str::from_utf8(&data[range]) {
+            Ok(string) => strings.push(Some(string)),
+            Err(_) => return Err(PyValueError::new_err("data is not valid UTF-8")),
+        }
+    }
+
+    Ok(strings)
+}
+
+/// Builds a dict mapping every part, and registered_domain when asked to, to the (validity, offsets, data)
+/// buffers of an Arrow large_string array. A None item stands for a null entry.
+fn build_columns<'a>(
+    py: Python,
+    error_policy: ErrorPolicy,
+    registered_domain: bool,
+    domains_spans: impl Iterator<Item = Option<Result<(&'a str, DomainSpans), ExtractionError>>>,
+) -> PyResult<PyObject> {
+    let mut rows = Vec::new();
+    for domain_spans in domains_spans {
+        match domain_spans {
+            Some(Ok(row)) => rows.push(Some(row)),
+            Some(Err(err)) => match error_policy {
+                ErrorPolicy::Raise => return Err(err.into()),
+                ErrorPolicy::Skip => {},
+                ErrorPolicy::EmitNone => rows.push(None),
+            },
+            None => match error_policy {
+                ErrorPolicy::Skip => {},
+                _ => rows.push(None),
+            },
+        }
+    }
+
+    let validity = if rows.iter().any(Option::is_none) {
+        let mut bitmap = vec![0u8; rows.len().div_ceil(8)];
+        for (index, row) in rows.iter().enumerate() {
+            if row.is_some() {
+                bitmap[index / 8] |= 1 << (index % 8);
+            }
+        }
+
+        Some(PyBytes::new(py, &bitmap))
+    } else {
+        None
+    };
+
+    let columns = PyDict::new(py);
+    let part_columns = [
+        ("suffix", DomainSpans::suffix_range as fn(&DomainSpans) -> Range<usize>),
+        ("domain", DomainSpans::domain_range),
+        ("subdomain", DomainSpans::subdomain_range),
+        ("registered_domain", DomainSpans::registered_domain_range),
+    ];
+    let columns_count = if registered_domain { part_columns.len() } else { part_columns.len() - 1 };
+    for (column_name, part_range) in part_columns.into_iter().take(columns_count) {
+        let mut offsets = Vec::with_capacity((rows.len() + 1) * 8);
+        let mut data_len = 0;
+        offsets.extend_from_slice(&0i64.to_ne_bytes());
+        for row in rows.iter() {
+            if let Some((_domain, spans)) = row {
+                data_len += part_range(spans).len();
+            }
+            offsets.extend_from_slice(&(data_len as i64).to_ne_bytes());
+        }
+
+        let data = PyBytes::new_with(
+            py,
+            data_len,
+            |buffer| {
+                let mut position = 0;
+                for (domain, spans) in rows.iter().flatten() {
+                    let part = &domain.as_bytes()[part_range(spans)];
+                    buffer[position..position + part.len()].copy_from_slice(part);
+                    position += part.len();
+                }
+                buffer.make_ascii_lowercase();
+
+                Ok(())
+            },
+        )?;
+
+        columns.set_item(
+            column_name,
+            (validity, PyBytes::new(py, &offsets), data),
+        )?;
+    }
+
+    Ok(columns.to_object(py))
+}
+
+fn build_result(
+    py: Python,
+    suffix_part: &str,
+    domain_part: &str,
+    subdomain_part: &str,
+    is_private: bool,
+    host_kind: Option<HostKind>,
+    result_form: ResultForm,
+) -> PyResult<PyObject> {
+    match result_form {
+        ResultForm::Dict => Ok(build_result_dict(py, suffix_part, domain_part, subdomain_part)),
+        ResultForm::BytesDict => build_bytes_result_dict(py, suffix_part, domain_part, subdomain_part),
+        ResultForm::Compact => {
+            let extract_result = ExtractResult {
+                suffix: new_part_string(py, suffix_part),
+                domain: new_part_string(py, domain_part),
+                subdomain: new_part_string(py, subdomain_part),
+                is_private,
+                host_kind: host_kind.unwrap_or(HostKind::Domain),
+            };
+
+            Ok(Py::new(py, extract_result)?.into_py(py))
+        },
+    }
+}
+
+fn build_bytes_result_dict(
+    py: Python,
+    suffix_part: &str,
+    domain_part: &str,
+    subdomain_part: &str,
+) -> PyResult<PyObject> {
+    let dict = PyDict::new(py);
+    dict.set_item(intern!(py, "suffix"), PyBytes::new(py, suffix_part.as_bytes()))?;
+    dict.set_item(intern!(py, "domain"), PyBytes::new(py, domain_part.as_bytes()))?;
+    dict.set_item(intern!(py, "subdomain"), PyBytes::new(py, subdomain_part.as_bytes()))?;
+
+    Ok(dict.to_object(py))
+}
+
+/// The components of a url as urllib.parse.urlsplit reports them: a lowercase scheme and host,
+/// and empty strings for the missing components. The host parts are added as in the result dict.
+fn build_url_parts_dict(
+    py: Python,
+    url: &str,
+    components: &UrlComponents,
+    url_host: &UrlHost,
+    spans: &DomainSpans,
+) -> PyResult<PyObject> {
+    let host_string = lowercase_domain(url_host.as_str(url))?;
+    let (suffix_part, domain_part, subdomain_part) = spans.parts(host_string.as_str());
+    let optional_part = |range: &Option<Range<usize>>| {
+        new_part_string(py, range.clone().map_or("", |range| &url[range]))
+    };
+
+    let dict = PyDict::new(py);
+    dict.set_item(intern!(py, "scheme"), url[components.scheme.clone()].to_ascii_lowercase())?;
+    dict.set_item(intern!(py, "has_userinfo"), components.userinfo.is_some())?;
+    dict.set_item(intern!(py, "host"), new_part_string(py, host_string.as_str()))?;
+    dict.set_item(intern!(py, "host_type"), url_host.kind.name())?;
+    dict.set_item(intern!(py, "port"), components.port)?;
+    dict.set_item(intern!(py, "path"), new_part_string(py, &url[components.path.clone()]))?;
+    dict.set_item(intern!(py, "query"), optional_part(&components.query))?;
+    dict.set_item(intern!(py, "fragment"), optional_part(&components.fragment))?;
+    dict.set_item(intern!(py, "suffix"), new_part_string(py, suffix_part))?;
+    dict.set_item(intern!(py, "domain"), new_part_string(py, domain_part))?;
+    dict.set_item(intern!(py, "subdomain"), new_part_string(py, subdomain_part))?;
+
+    Ok(dict.to_object(py))
+}
+
+fn new_part_string(
+    py: Python,
+    part: &str,
+) -> Py<PyString> {
+    if part.is_empty() {
+        intern!(py, "").into()
+    } else {
+        PyString::new(py, part).into()
+    }
+}
+
+fn build_result_dict(
+    py: Python,
+    suffix_part: &str,
+    domain_part: &str,
+    subdomain_part: &str,
+) -> PyObject {
+    unsafe {
+        let dict = pyo3::ffi::PyDict_New();
+        for (fraction_key, fraction) in [
+            (intern!(py, "suffix").into_ptr(), suffix_part),
+            (intern!(py, "domain").into_ptr(), domain_part),
+            (intern!(py, "subdomain").into_ptr(), subdomain_part),
+        ] {
+            if !fraction.is_empty() {
+                let substr = pyo3::ffi::PyUnicode_FromStringAndSize(
+                    fraction.as_ptr() as *const c_char,
+                    fraction.len() as isize,
+                );
+
+                pyo3::ffi::PyDict_SetItem(
+                    dict,
+                    fraction_key,
+                    substr,
+                );
+                pyo3::ffi::Py_DECREF(substr);
+            } else {
+                pyo3::ffi::PyDict_SetItem(
+                    dict,
+                    fraction_key,
+                    intern!(py, "").into_ptr(),
+                );
+            }
+        }
+
+        pyo3::PyObject::from_owned_ptr(py, dict)
+    }
 }
 
 #[pymodule]
@@ -356,5 +2173,9 @@ fn pydomainextractor(
     m: &PyModule,
 ) -> PyResult<()> {
     m.add_class::<DomainExtractor>()?;
+    m.add_class::<ExtractResult>()?;
+    m.add_class::<matcher::DomainMatcher>()?;
+    m.add_class::<FileExtractionIterator>()?;
+    m.add_class::<LookalikeIterator>()?;
     Ok(())
 }
@@ -0,0 +1,220 @@
+//! Generation of lookalike domains, the permutations of a domain label typosquatters register.
+//! Candidates are generated up front, as they are cheap to build, and validated against the
+//! suffix list in batches, as that is where the time goes.
+
+use crate::{parallel_map, SuffixTrie};
+use ahash::AHashSet;
+use pyo3::exceptions::PyValueError;
+use pyo3::intern;
+use pyo3::prelude::*;
+use pyo3::types::PyString;
+use std::sync::Arc;
+
+#[derive(Clone, Copy, PartialEq, Eq)]
+pub enum LookalikeKind {
+    Omission,
+    Transposition,
+    Homoglyph,
+    BitFlip,
+    TldSwap,
+}
+
+impl LookalikeKind {
+    pub const ALL: [LookalikeKind; 5] = [
+        LookalikeKind::Omission,
+        LookalikeKind::Transposition,
+        LookalikeKind::Homoglyph,
+        LookalikeKind::BitFlip,
+        LookalikeKind::TldSwap,
+    ];
+
+    pub fn parse(
+        kind: &str,
+    ) -> PyResult<Self> {
+        match kind {
+            "omission" => Ok(LookalikeKind::Omission),
+            "transposition" => Ok(LookalikeKind::Transposition),
+            "homoglyph" => Ok(LookalikeKind::Homoglyph),
+            "bit_flip" => Ok(LookalikeKind::BitFlip),
+            "tld_swap" => Ok(LookalikeKind::TldSwap),
+            _ => Err(
+                PyValueError::new_err("kinds must be among: 'omission', 'transposition', 'homoglyph', 'bit_flip', 'tld_swap'")
+            ),
+        }
+    }
+
+    fn name<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> &'py PyString {
+        match self {
+            LookalikeKind::Omission => intern!(py, "omission"),
+            LookalikeKind::Transposition => intern!(py, "transposition"),
+            LookalikeKind::Homoglyph => intern!(py, "homoglyph"),
+            LookalikeKind::BitFlip => intern!(py, "bit_flip"),
+            LookalikeKind::TldSwap => intern!(py, "tld_swap"),
+        }
+    }
+}
+
+/// Characters that read like others: ASCII ones, accented ones, and Cyrillic and Greek
+/// letters that render like Latin ones in most fonts
+fn homoglyphs(
+    character: char,
+) -> &'static [&'static str] {
+    match character {
+        'a' => &["à", "á", "â", "ä", "å", "ɑ", "а"],
+        'b' => &["6", "ь"],
+        'c' => &["ç", "с", "ϲ"],
+        'd' => &["cl", "ԁ"],
+        'e' => &["é", "è", "ê", "ë", "е"],
+        'g' => &["q", "9", "ɡ"],
+        'h' => &["һ"],
+        'i' => &["1", "l", "í", "ì", "ï", "і"],
+        'j' => &["ј"],
+        'k' => &["к"],
+        'l' => &["1", "i", "ӏ"],
+        'm' => &["rn", "nn"],
+        'n' => &["m", "ո"],
+        'o' => &["0", "ò", "ó", "ö", "ο", "о"],
+        'p' => &["р", "ρ"],
+        'q' => &["g", "ԛ"],
+        'r' => &["г"],
+        's' => &["5", "ѕ"],
+        't' => &["7"],
+        'u' => &["ü", "ú", "υ", "ս"],
+        'v' => &["ν", "ѵ"],
+        'w' => &["vv", "ѡ"],
+        'x' => &["х"],
+        'y' => &["у", "ý"],
+        'z' => &["2"],
+        '0' => &["o"],
+        '1' => &["l", "i"],
+        _ => &[],
+    }
+}
+
+/// The permutations of domain_label under suffix, and of domain_label under every other suffix of
+/// suffixes for the TLD swaps. Each candidate is yielded once, with the first kind producing it.
+pub fn generate_lookalikes(
+    domain_label: &str,
+    suffix: &str,
+    suffixes: &[String],
+    kinds: &[LookalikeKind],
+) -> Vec<(String, LookalikeKind)> {
+    let characters: Vec<char> = domain_label.chars().collect();
+    let with_suffix = |label: String| format!("{}.{}", label, suffix);
+
+    let mut candidates = Vec::new();
+    for &kind in LookalikeKind::ALL.iter().filter(|kind| kinds.contains(kind)) {
+        match kind {
+            LookalikeKind::Omission => {
+                for index in 0..characters.len() {
+                    let label = characters[..index].iter().chain(&characters[index + 1..]).collect();
+                    candidates.push((with_suffix(label), kind));
+                }
+            },
+            LookalikeKind::Transposition => {
+                for index in 1..characters.len() {
+                    if characters[index - 1] != characters[index] {
+                        let mut label = characters.clone();
+                        label.swap(index - 1, index);
+                        candidates.push((with_suffix(label.into_iter().collect()), kind));
+                    }
+                }
+            },
+            LookalikeKind::Homoglyph => {
+                for (index, &character) in characters.iter().enumerate() {
+                    for homoglyph in homoglyphs(character) {
+                        let mut label: String = characters[..index].iter().collect();
+                        label.push_str(homoglyph);
+                        label.extend(&characters[index + 1..]);
+                        candidates.push((with_suffix(label), kind));
+                    }
+                }
+            },
+            LookalikeKind::BitFlip => {
+                for (index, &character) in characters.iter().enumerate() {
+                    if !character.is_ascii() {
+                        continue;
+                    }
+                    for bit in 0..8 {
+                        let flipped = (character as u8 ^ (1 << bit)) as char;
+                        if flipped.is_ascii_lowercase() || flipped.is_ascii_digit() || flipped == '-' {
+                            let mut label = characters.clone();
+                            label[index] = flipped;
+                            candidates.push((with_suffix(label.into_iter().collect()), kind));
+                        }
+                    }
+                }
+            },
+            LookalikeKind::TldSwap => {
+                // The suffix list holds the punycode form of every internationalized suffix
+                // next to its unicode form, only the latter is used
+                for other_suffix in suffixes {
+                    if !other_suffix.contains(['*', '!']) && !other_suffix.contains("xn--") {
+                        candidates.push((format!("{}.{}", domain_label, other_suffix), kind));
+                    }
+                }
+            },
+        }
+    }
+
+    let mut seen = AHashSet::with_capacity(candidates.len());
+    seen.insert(with_suffix(domain_label.to_string()));
+    candidates.retain(|(candidate, _)| seen.insert(candidate.clone()));
+
+    candidates
+}
+
+/// Yields the candidates that are valid registrable domains, as lists of (domain, kind) tuples.
+/// Each list holds what is left of up to batch_size candidates once the invalid ones are dropped.
+#[pyclass]
+pub struct LookalikeIterator {
+    pub suffix_trie: Arc<SuffixTrie>,
+    pub candidates: Vec<(String, LookalikeKind)>,
+    pub position: usize,
+    pub batch_size: usize,
+    pub num_threads: usize,
+}
+
+#[pymethods]
+impl LookalikeIterator {
+    fn __iter__(
+        slf: PyRef<Self>,
+    ) -> PyRef<Self> {
+        slf
+    }
+
+    fn __next__(
+        mut slf: PyRefMut<Self>,
+        py: Python,
+    ) -> PyResult<Option<PyObject>> {
+        let iterator = &mut *slf;
+        while iterator.position < iterator.candidates.len() {
+            let batch_end = (iterator.position + iterator.batch_size).min(iterator.candidates.len());
+            let batch = &iterator.candidates[iterator.position..batch_end];
+            iterator.position = batch_end;
+
+            let suffix_trie = &iterator.suffix_trie;
+            let registrable = py.allow_threads(
+                || parallel_map(
+                    batch,
+                    iterator.num_threads,
+                    |(candidate, _)| suffix_trie.is_registrable(candidate),
+                )
+            );
+
+            let results: Vec<(&str, &PyString)> = batch.iter().zip(registrable).filter(
+                |(_, is_registrable)| *is_registrable
+            ).map(
+                |((candidate, kind), _)| (candidate.as_str(), kind.name(py))
+            ).collect();
+            if !results.is_empty() {
+                return Ok(Some(results.to_object(py)));
+            }
+        }
+
+        Ok(None)
+    }
+}
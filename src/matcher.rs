@@ -0,0 +1,167 @@
+//! Matching of hosts against a watchlist of domains. The watchlist is indexed once by domain and by
+//! registered domain, so a host is matched with a few hash lookups and a single suffix list lookup.
+
+use crate::{collect_strings, lowercase_domain, parallel_map, DomainExtractor, SuffixTrie};
+use ahash::AHashMap;
+use pyo3::intern;
+use pyo3::prelude::*;
+use pyo3::types::PyString;
+use std::sync::Arc;
+
+#[derive(Clone, Copy)]
+enum MatchKind {
+    Exact,
+    Subdomain,
+    RegisteredDomain,
+}
+
+impl MatchKind {
+    fn name<'py>(
+        &self,
+        py: Python<'py>,
+    ) -> &'py PyString {
+        match self {
+            MatchKind::Exact => intern!(py, "exact"),
+            MatchKind::Subdomain => intern!(py, "subdomain"),
+            MatchKind::RegisteredDomain => intern!(py, "registered_domain"),
+        }
+    }
+}
+
+/// Matches hosts against a watchlist of domains. The suffix list is the one of the extractor
+/// at the time the matcher was built, reloading the extractor does not affect it.
+#[pyclass(module = "pydomainextractor.pydomainextractor")]
+pub struct DomainMatcher {
+    suffix_trie: Arc<SuffixTrie>,
+    entries: Vec<Py<PyString>>,
+    domains: AHashMap<Box<str>, usize>,
+    registered_domains: AHashMap<Box<str>, usize>,
+}
+
+impl DomainMatcher {
+    /// The closest entry of the host: the host itself, then its nearest parent domain,
+    /// then any entry of the same registered domain. Invalid hosts match nothing.
+    fn find(
+        &self,
+        host: &str,
+    ) -> Option<(usize, MatchKind)> {
+        let host_string = lowercase_domain(host).ok()?;
+        let host = host_string.as_str();
+        let spans = self.suffix_trie.domain_spans(host).ok()?;
+
+        if let Some(&entry_index) = self.domains.get(host) {
+            return Some((entry_index, MatchKind::Exact));
+        }
+
+        let mut parent_domain = host;
+        while let Some(dot_index) = memchr::memchr(b'.', parent_domain.as_bytes()) {
+            parent_domain = &parent_domain[dot_index + 1..];
+            if let Some(&entry_index) = self.domains.get(parent_domain) {
+                return Some((entry_index, MatchKind::Subdomain));
+            }
+        }
+
+        let registered_domain = &host[spans.registered_domain_range()];
+        if registered_domain.is_empty() {
+            return None;
+        }
+
+        self.registered_domains.get(registered_domain).map(
+            |&entry_index| (entry_index, MatchKind::RegisteredDomain)
+        )
+    }
+
+    fn match_result(
+        &self,
+        py: Python,
+        found: Option<(usize, MatchKind)>,
+    ) -> PyObject {
+        match found {
+            Some((entry_index, match_kind)) => (self.entries[entry_index].clone_ref(py), match_kind.name(py)).to_object(py),
+            None => py.None(),
+        }
+    }
+}
+
+#[pymethods]
+impl DomainMatcher {
+    #[new]
+    #[args(domain_extractor = "None")]
+    fn new(
+        py: Python,
+        domains: &PyAny,
+        domain_extractor: Option<PyRef<DomainExtractor>>,
+    ) -> PyResult<Self> {
+        let suffix_trie = match domain_extractor {
+            Some(domain_extractor) => domain_extractor.suffix_trie(),
+            None => Arc::new(SuffixTrie::from_suffix_list(None)),
+        };
+
+        let mut entries = Vec::new();
+        let mut domains_index = AHashMap::new();
+        let mut registered_domains = AHashMap::new();
+        for domain in collect_strings(domains)? {
+            let domain_string = lowercase_domain(&domain)?;
+            let domain = domain_string.as_str();
+            let spans = suffix_trie.domain_spans(domain)?;
+            if domains_index.contains_key(domain) {
+                continue;
+            }
+
+            let entry_index = entries.len();
+            entries.push(PyString::new(py, domain).into());
+            domains_index.insert(domain.into(), entry_index);
+
+            let registered_domain = &domain[spans.registered_domain_range()];
+            if !registered_domain.is_empty() {
+                registered_domains.entry(registered_domain.into()).or_insert(entry_index);
+            }
+        }
+
+        Ok(
+            DomainMatcher {
+                suffix_trie,
+                entries,
+                domains: domains_index,
+                registered_domains,
+            }
+        )
+    }
+
+    fn __len__(
+        &self,
+    ) -> usize {
+        self.entries.len()
+    }
+
+    fn match_domain(
+        &self,
+        py: Python,
+        host: &PyString,
+    ) -> PyObject {
+        self.match_result(py, self.find(&host.to_string_lossy()))
+    }
+
+    #[args(num_threads = "1")]
+    fn match_many(
+        &self,
+        py: Python,
+        hosts: &PyAny,
+        num_threads: usize,
+    ) -> PyResult<Vec<PyObject>> {
+        let hosts = collect_strings(hosts)?;
+        let found = py.allow_threads(
+            || parallel_map(
+                &hosts,
+                num_threads,
+                |host| self.find(host),
+            )
+        );
+
+        Ok(
+            found.into_iter().map(
+                |found| self.match_result(py, found)
+            ).collect()
+        )
+    }
+}
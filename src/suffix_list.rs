@@ -0,0 +1,682 @@
+//! Parsing of the public suffix list format and the compiled binary form of the parsed trie.
+//! This module is shared with build.rs and therefore must not depend on pyo3.
+
+use ahash::AHashMap;
+use std::collections::VecDeque;
+
+/// Nodes and wildcards are part of the ICANN section as soon as one ICANN rule goes through them,
+/// and of the private section otherwise
+#[derive(Default)]
+struct SuffixNode {
+    children: Vec<(String, u32)>,
+    is_wildcard: bool,
+    is_icann: bool,
+    is_icann_wildcard: bool,
+    blacklist: Vec<String>,
+}
+
+/// The parsed suffix list. Nodes are kept in a single arena and only live until the list is compiled.
+pub struct SuffixTree {
+    nodes: Vec<SuffixNode>,
+    children_index: AHashMap<(u32, String), u32>,
+    pub tld_list: Vec<String>,
+}
+
+impl SuffixTree {
+    fn child_or_insert(
+        &mut self,
+        node: u32,
+        label: &str,
+    ) -> u32 {
+        if let Some(child) = self.children_index.get(&(node, label.to_string())) {
+            return *child;
+        }
+
+        let child = self.nodes.len() as u32;
+        self.nodes.push(SuffixNode::default());
+        self.nodes[node as usize].children.push((label.to_string(), child));
+        self.children_index.insert((node, label.to_string()), child);
+
+        child
+    }
+}
+
+pub fn parse_suffix_list(
+    suffixes_list: &str,
+) -> SuffixTree {
+    let mut suffix_tree = SuffixTree {
+        nodes: vec![SuffixNode { is_icann: true, ..SuffixNode::default() }],
+        children_index: AHashMap::new(),
+        tld_list: Vec::new(),
+    };
+
+    // Lists without section markers, such as custom lists, are entirely ICANN
+    let mut is_icann = true;
+    for line in suffixes_list.lines().map(
+        |line| line.to_ascii_lowercase()
+    ) {
+        if line.starts_with("//") || line.is_empty() {
+            if line.contains("===begin private domains===") {
+                is_icann = false;
+            } else if line.contains("===end private domains===") {
+                is_icann = true;
+            }
+            continue;
+        }
+
+        let mut tlds = vec![line.clone()];
+        if !line.is_ascii() {
+            tlds.push(idna::domain_to_ascii(&line).unwrap());
+        }
+        for tld in tlds {
+            let mut fractions = tld.rsplit('.');
+            let mut current_node = suffix_tree.child_or_insert(0, fractions.next().unwrap());
+            suffix_tree.nodes[current_node as usize].is_icann |= is_icann;
+
+            for fraction in fractions {
+                if let Some(blacklisted) = fraction.strip_prefix('!') {
+                    let blacklist = &mut suffix_tree.nodes[current_node as usize].blacklist;
+                    if !blacklist.iter().any(|label| label == blacklisted) {
+                        blacklist.push(blacklisted.to_string());
+                    }
+                } else if fraction == "*" {
+                    let suffix_node = &mut suffix_tree.nodes[current_node as usize];
+                    suffix_node.is_wildcard = true;
+                    suffix_node.is_icann_wildcard |= is_icann;
+                } else {
+                    current_node = suffix_tree.child_or_insert(current_node, fraction);
+                    suffix_tree.nodes[current_node as usize].is_icann |= is_icann;
+                }
+            }
+
+            suffix_tree.tld_list.push(tld);
+        }
+    }
+
+    suffix_tree
+}
+
+/// The compiled form is a flat, position independent layout of little endian u32 values:
+///
+/// ```text
+/// header:    magic, version, node_count, edge_count, blacklist_count, tld_count, bucket_count, strings_len
+/// nodes:     node_count * (first_blacklist, blacklist_count, flags)
+/// blacklist: blacklist_count * (label_offset, label_len), sorted by label per node
+/// tlds:      tld_count * (offset, len)
+/// edges:     bucket_count * (label_word (u64), parent_node, label_len, child_node, label_offset)
+/// strings:   strings_len bytes of UTF-8 text
+/// ```
+///
+/// Node 0 is the root, holding the top level domains as its children. The edges of all the
+/// nodes form a single open addressing table keyed by the parent node and the label, so every
+/// step down the trie is one probe into one contiguous table instead of a hash map per node.
+/// Buckets with a child_node of 0 are empty, as the root is never a child. Edges are placed by
+/// linear probing from the bucket of their edge_key hash. The node flags mark the wildcards, and
+/// the nodes and wildcards that only come from the private section of the list.
+pub const COMPILED_MAGIC: &[u8; 4] = b"PDXT";
+pub const COMPILED_VERSION: u32 = 3;
+pub const HEADER_SIZE: usize = 8 * 4;
+pub const NODE_SIZE: usize = 3 * 4;
+pub const STRING_REF_SIZE: usize = 2 * 4;
+pub const EDGE_SIZE: usize = 6 * 4;
+
+pub const NODE_FLAG_WILDCARD: u32 = 1;
+pub const NODE_FLAG_PRIVATE: u32 = 2;
+pub const NODE_FLAG_PRIVATE_WILDCARD: u32 = 4;
+
+/// Hashes the parent node and the label, reading the label in words rather than bytes.
+/// Also returns the last word of the label, which is distinct for every label of up to 8 bytes
+/// of a given length, so such labels are matched without reading the strings table.
+/// The hash has to be stable across builds and processes, which rules out the randomly seeded hashers.
+#[inline]
+fn edge_key(
+    node: u32,
+    label: &[u8],
+) -> (u64, u32) {
+    const SEED: u64 = 0x51_7c_c1_b7_27_22_0a_95;
+
+    let len = label.len();
+    let mut hash = ((node as u64) << 32 | len as u64).wrapping_mul(SEED);
+    let mut rest = label;
+    while rest.len() > 8 {
+        hash = (hash.rotate_left(5) ^ read_u64(rest, 0)).wrapping_mul(SEED);
+        rest = &rest[8..];
+    }
+
+    // The last word may overlap the previous one, which is fine as the length is part of the hash
+    let word = if len >= 8 {
+        read_u64(label, len - 8)
+    } else if len >= 4 {
+        (read_u32(label, 0) as u64) << 32 | read_u32(label, len - 4) as u64
+    } else if len > 0 {
+        (label[0] as u64) << 16 | (label[len / 2] as u64) << 8 | label[len - 1] as u64
+    } else {
+        0
+    };
+
+    (word, ((hash.rotate_left(5) ^ word).wrapping_mul(SEED) >> 32) as u32)
+}
+
+#[derive(Default)]
+struct StringsTable {
+    data: Vec<u8>,
+    offsets: AHashMap<String, u32>,
+}
+
+impl StringsTable {
+    fn add(
+        &mut self,
+        string: &str,
+    ) -> (u32, u32) {
+        let offset = match self.offsets.get(string) {
+            Some(offset) => *offset,
+            None => {
+                let offset = self.data.len() as u32;
+                self.data.extend_from_slice(string.as_bytes());
+                self.offsets.insert(string.to_string(), offset);
+
+                offset
+            },
+        };
+
+        (offset, string.len() as u32)
+    }
+}
+
+pub fn compile_suffix_list(
+    suffix_tree: &SuffixTree,
+) -> Vec<u8> {
+    let mut strings = StringsTable::default();
+    let mut nodes: Vec<[u32; 3]> = Vec::with_capacity(suffix_tree.nodes.len());
+    let mut edges: Vec<(u32, [u32; 6])> = Vec::with_capacity(suffix_tree.nodes.len());
+    let mut blacklist: Vec<[u32; 2]> = Vec::new();
+
+    // Nodes are renumbered in breadth first order, so the output does not depend on the arena order
+    let mut queue = VecDeque::from([0u32]);
+    while let Some(tree_node) = queue.pop_front() {
+        let suffix_node = &suffix_tree.nodes[tree_node as usize];
+        let node = nodes.len() as u32;
+
+        let mut children: Vec<&(String, u32)> = suffix_node.children.iter().collect();
+        children.sort_unstable_by(|a, b| a.0.as_bytes().cmp(b.0.as_bytes()));
+        for (label, child) in children {
+            let (label_offset, label_len) = strings.add(label);
+            let (word, hash) = edge_key(node, label.as_bytes());
+            let child_node = (nodes.len() + queue.len() + 1) as u32;
+            edges.push((hash, [word as u32, (word >> 32) as u32, node, label_len, child_node, label_offset]));
+            queue.push_back(*child);
+        }
+
+        let first_blacklist = blacklist.len() as u32;
+        let mut blacklisted_labels: Vec<&String> = suffix_node.blacklist.iter().collect();
+        blacklisted_labels.sort_unstable_by(|a, b| a.as_bytes().cmp(b.as_bytes()));
+        for label in blacklisted_labels {
+            let (label_offset, label_len) = strings.add(label);
+            blacklist.push([label_offset, label_len]);
+        }
+
+        let mut flags = 0;
+        if suffix_node.is_wildcard {
+            flags |= NODE_FLAG_WILDCARD;
+            if !suffix_node.is_icann_wildcard {
+                flags |= NODE_FLAG_PRIVATE_WILDCARD;
+            }
+        }
+        if !suffix_node.is_icann {
+            flags |= NODE_FLAG_PRIVATE;
+        }
+        nodes.push([first_blacklist, blacklist.len() as u32 - first_blacklist, flags]);
+    }
+
+    // Keeping the table at most half full keeps the probe sequences short and guarantees an empty bucket
+    let bucket_count = (edges.len() * 2).next_power_of_two();
+    let mut buckets = vec![[0u32; 6]; bucket_count];
+    for (hash, edge) in edges.iter() {
+        let mut bucket = *hash as usize & (bucket_count - 1);
+        while buckets[bucket][4] != 0 {
+            bucket = (bucket + 1) & (bucket_count - 1);
+        }
+        buckets[bucket] = *edge;
+    }
+
+    let tlds: Vec<[u32; 2]> = suffix_tree.tld_list.iter().map(
+        |tld| {
+            let (offset, len) = strings.add(tld);
+
+            [offset, len]
+        }
+    ).collect();
+
+    let mut compiled = Vec::with_capacity(
+        HEADER_SIZE + nodes.len() * NODE_SIZE + (blacklist.len() + tlds.len()) * STRING_REF_SIZE +
+        bucket_count * EDGE_SIZE + strings.data.len()
+    );
+    compiled.extend_from_slice(COMPILED_MAGIC);
+    for value in [
+        COMPILED_VERSION,
+        nodes.len() as u32,
+        edges.len() as u32,
+        blacklist.len() as u32,
+        tlds.len() as u32,
+        bucket_count as u32,
+        strings.data.len() as u32,
+    ] {
+        compiled.extend_from_slice(&value.to_le_bytes());
+    }
+    let sections = nodes.iter().flatten()
+        .chain(blacklist.iter().flatten())
+        .chain(tlds.iter().flatten())
+        .chain(buckets.iter().flatten());
+    for value in sections {
+        compiled.extend_from_slice(&value.to_le_bytes());
+    }
+    compiled.extend_from_slice(&strings.data);
+
+    compiled
+}
+
+/// The suffix, domain and subdomain parts of a domain
+pub type DomainParts<'a> = (&'a str, &'a str, &'a str);
+
+/// A compiled suffix list queried in place. Nothing is deserialized, so wrapping a static,
+/// owned or memory mapped buffer costs the same regardless of the size of the list.
+pub struct CompiledSuffixList<D> {
+    data: D,
+    node_count: usize,
+    blacklist_offset: usize,
+    blacklist_count: usize,
+    tlds_offset: usize,
+    tld_count: usize,
+    edges_offset: usize,
+    bucket_count: usize,
+    strings_offset: usize,
+    strings_len: usize,
+}
+
+impl<D: AsRef<[u8]>> CompiledSuffixList<D> {
+    /// Checks the header and the sections sizes only. Buffers that were not produced by
+    /// compile_suffix_list should also go through validate before being queried.
+    pub fn new(
+        data: D,
+    ) -> Result<Self, String> {
+        let compiled = data.as_ref();
+        if compiled.len() < HEADER_SIZE || &compiled[..4] != COMPILED_MAGIC {
+            return Err("compiled suffix list has an invalid header".to_string());
+        }
+
+        let header_value = |index: usize| read_u32(compiled, 4 + index * 4) as usize;
+        if header_value(0) != COMPILED_VERSION as usize {
+            return Err(format!("compiled suffix list version {} is not supported", header_value(0)));
+        }
+
+        let node_count = header_value(1);
+        let blacklist_count = header_value(3);
+        let tld_count = header_value(4);
+        let bucket_count = header_value(5);
+        let strings_len = header_value(6);
+        if node_count == 0 || !bucket_count.is_power_of_two() || header_value(2) >= bucket_count {
+            return Err("compiled suffix list has an invalid header".to_string());
+        }
+
+        let blacklist_offset = HEADER_SIZE + node_count * NODE_SIZE;
+        let tlds_offset = blacklist_offset + blacklist_count * STRING_REF_SIZE;
+        let edges_offset = tlds_offset + tld_count * STRING_REF_SIZE;
+        let strings_offset = edges_offset + bucket_count * EDGE_SIZE;
+        if strings_offset + strings_len != compiled.len() {
+            return Err("compiled suffix list is truncated".to_string());
+        }
+
+        Ok(
+            CompiledSuffixList {
+                data,
+                node_count,
+                blacklist_offset,
+                blacklist_count,
+                tlds_offset,
+                tld_count,
+                edges_offset,
+                bucket_count,
+                strings_offset,
+                strings_len,
+            }
+        )
+    }
+
+    /// Verifies that every reference inside the buffer stays in bounds, so the lookups
+    /// can never index outside of it.
+    pub fn validate(
+        &self,
+    ) -> Result<(), String> {
+        for node in 0..self.node_count {
+            let (first_blacklist, blacklist_count) = self.node_blacklist(node as u32);
+            if first_blacklist + blacklist_count > self.blacklist_count {
+                return Err("compiled suffix list has a blacklist out of bounds".to_string());
+            }
+        }
+
+        for blacklisted in 0..self.blacklist_count {
+            self.checked_string(self.blacklist_offset + blacklisted * STRING_REF_SIZE)?;
+        }
+
+        for tld in 0..self.tld_count {
+            self.checked_string(self.tlds_offset + tld * STRING_REF_SIZE)?;
+        }
+
+        for bucket in 0..self.bucket_count {
+            let edge_offset = self.edges_offset + bucket * EDGE_SIZE;
+            if self.value(edge_offset + 16) != 0 {
+                self.checked_edge_label(edge_offset)?;
+                if self.value(edge_offset + 8) as usize >= self.node_count || self.value(edge_offset + 16) as usize >= self.node_count {
+                    return Err("compiled suffix list has a node out of bounds".to_string());
+                }
+            }
+        }
+
+        Ok(())
+    }
+
+    pub fn as_bytes(
+        &self,
+    ) -> &[u8] {
+        self.data.as_ref()
+    }
+
+    /// Borrows the underlying buffer once, so that the lookups through the returned list
+    /// do not go through D::as_ref on every read
+    pub fn view(
+        &self,
+    ) -> CompiledSuffixList<&[u8]> {
+        CompiledSuffixList {
+            data: self.data.as_ref(),
+            node_count: self.node_count,
+            blacklist_offset: self.blacklist_offset,
+            blacklist_count: self.blacklist_count,
+            tlds_offset: self.tlds_offset,
+            tld_count: self.tld_count,
+            edges_offset: self.edges_offset,
+            bucket_count: self.bucket_count,
+            strings_offset: self.strings_offset,
+            strings_len: self.strings_len,
+        }
+    }
+
+    pub fn root(
+        &self,
+    ) -> u32 {
+        0
+    }
+
+    /// Looks up the child node reached from node through the given label
+    #[inline]
+    pub fn child(
+        &self,
+        node: u32,
+        label: &str,
+    ) -> Option<u32> {
+        let label = label.as_bytes();
+        let (word, hash) = edge_key(node, label);
+        let mut bucket = hash as usize & (self.bucket_count - 1);
+
+        // Bounded by the table size so a table without empty buckets can not loop forever
+        for _ in 0..self.bucket_count {
+            let edge_offset = self.edges_offset + bucket * EDGE_SIZE;
+            let child = self.value(edge_offset + 16);
+            if child == 0 {
+                return None;
+            }
+
+            let data = self.data.as_ref();
+            if read_u64(data, edge_offset) == word &&
+                read_u64(data, edge_offset + 8) == (label.len() as u64) << 32 | node as u64 &&
+                (label.len() <= 8 || self.edge_label(edge_offset) == label)
+            {
+                return Some(child);
+            }
+
+            bucket = (bucket + 1) & (self.bucket_count - 1);
+        }
+
+        None
+    }
+
+    #[inline]
+    pub fn is_wildcard(
+        &self,
+        node: u32,
+    ) -> bool {
+        self.value(self.node_offset(node) + 8) & NODE_FLAG_WILDCARD != 0
+    }
+
+    /// Whether the node only comes from rules of the private section of the list
+    #[inline]
+    pub fn is_private(
+        &self,
+        node: u32,
+    ) -> bool {
+        self.value(self.node_offset(node) + 8) & NODE_FLAG_PRIVATE != 0
+    }
+
+    /// Whether the wildcard of the node only comes from rules of the private section of the list
+    #[inline]
+    pub fn is_private_wildcard(
+        &self,
+        node: u32,
+    ) -> bool {
+        self.value(self.node_offset(node) + 8) & NODE_FLAG_PRIVATE_WILDCARD != 0
+    }
+
+    pub fn is_blacklisted(
+        &self,
+        node: u32,
+        label: &str,
+    ) -> bool {
+        let (first_blacklist, blacklist_count) = self.node_blacklist(node);
+
+        let (mut low, mut high) = (0, blacklist_count);
+        while low < high {
+            let middle = low + (high - low) / 2;
+            match self.string(self.blacklist_offset + (first_blacklist + middle) * STRING_REF_SIZE).cmp(label.as_bytes()) {
+                std::cmp::Ordering::Less => low = middle + 1,
+                std::cmp::Ordering::Greater => high = middle,
+                std::cmp::Ordering::Equal => return true,
+            }
+        }
+
+        false
+    }
+
+    pub fn tld_list(
+        &self,
+    ) -> Vec<String> {
+        (0..self.tld_count).map(
+            |tld| String::from_utf8_lossy(self.string(self.tlds_offset + tld * STRING_REF_SIZE)).into_owned()
+        ).collect()
+    }
+
+    /// Splits a lowercase domain into its suffix, domain and subdomain parts, walking its labels from
+    /// the right. Only the ICANN section of the list is used unless include_private is set. Also tells
+    /// whether the suffix that matched comes from the private section. None means the domain is invalid.
+    pub fn parse_domain_sections<'a>(
+        &self,
+        domain: &'a str,
+        include_private: bool,
+    ) -> Option<(DomainParts<'a>, bool)> {
+        let mut suffix_part = "";
+        let mut is_private = false;
+        let suffix_list = self.view();
+        let child = |node: u32, label: &str| {
+            suffix_list.child(node, label).filter(|&child| include_private || !suffix_list.is_private(child))
+        };
+        let is_wildcard = |node: u32| {
+            suffix_list.is_wildcard(node) && (include_private || !suffix_list.is_private_wildcard(node))
+        };
+        let mut current_node = suffix_list.root();
+        let mut last_dot_index = domain.len();
+        let mut in_wildcard_tld = false;
+        let mut last_suffix: Option<u32> = None;
+
+        while let Some(dot_index) = memchr::memrchr(b'.', &domain.as_bytes()[..last_dot_index]) {
+            let current_fraction = &domain[dot_index + 1..last_dot_index];
+            if current_fraction.is_empty() || dot_index == 0 {
+                return None;
+            }
+
+            if in_wildcard_tld {
+                if suffix_list.is_blacklisted(last_suffix.unwrap(), current_fraction) {
+                    let leftover_part = &domain[0..dot_index];
+
+                    return Some(((suffix_part, current_fraction, leftover_part), is_private));
+                }
+
+                if let Some(current_suffix) = child(current_node, current_fraction) {
+                    if !is_wildcard(current_suffix) {
+                        current_node = current_suffix;
+                    }
+                    last_suffix.replace(current_suffix);
+                    suffix_part = &domain[dot_index + 1..];
+                    is_private = suffix_list.is_private(current_suffix);
+                    last_dot_index = dot_index;
+                } else {
+                    suffix_part = &domain[dot_index + 1..];
+                    is_private = suffix_list.is_private_wildcard(last_suffix.unwrap());
+                    let leftover_part = &domain[0..dot_index];
+                    match leftover_part.rsplit_once('.') {
+                        Some((subdomain_part, domain_part)) => {
+                            if subdomain_part.ends_with('.') {
+                                return None;
+                            }
+                            return Some(((suffix_part, domain_part, subdomain_part), is_private));
+                        }
+                        None => {
+                            return Some(((suffix_part, leftover_part, ""), is_private));
+                        }
+                    }
+                }
+            }
+            if let Some(current_suffix) = child(current_node, current_fraction) {
+                in_wildcard_tld = is_wildcard(current_suffix);
+
+                current_node = current_suffix;
+                last_suffix.replace(current_suffix);
+                suffix_part = &domain[dot_index + 1..];
+                is_private = suffix_list.is_private(current_suffix);
+                last_dot_index = dot_index;
+            } else {
+                let leftover_part = &domain[0..last_dot_index];
+                match leftover_part.rsplit_once('.') {
+                    Some((subdomain_part, domain_part)) => {
+                        if subdomain_part.ends_with('.') {
+                            return None;
+                        }
+                        return Some(((suffix_part, domain_part, subdomain_part), is_private));
+                    }
+                    None => {
+                        return Some(((suffix_part, leftover_part, ""), is_private));
+                    }
+                };
+            }
+        }
+
+        let current_fraction = &domain[0..last_dot_index];
+        if in_wildcard_tld {
+            if suffix_list.is_blacklisted(last_suffix.unwrap(), current_fraction) {
+                Some(((suffix_part, current_fraction, ""), is_private))
+            } else {
+                Some(((domain, "", ""), suffix_list.is_private_wildcard(last_suffix.unwrap())))
+            }
+        } else if let Some(current_suffix) = child(current_node, current_fraction) {
+            Some(((domain, "", ""), suffix_list.is_private(current_suffix)))
+        } else {
+            Some(((suffix_part, current_fraction, ""), is_private))
+        }
+    }
+
+    fn node_offset(
+        &self,
+        node: u32,
+    ) -> usize {
+        HEADER_SIZE + node as usize * NODE_SIZE
+    }
+
+    fn node_blacklist(
+        &self,
+        node: u32,
+    ) -> (usize, usize) {
+        let node_offset = self.node_offset(node);
+
+        (self.value(node_offset) as usize, self.value(node_offset + 4) as usize)
+    }
+
+    fn string(
+        &self,
+        offset: usize,
+    ) -> &[u8] {
+        self.string_at(self.value(offset) as usize, self.value(offset + 4) as usize)
+    }
+
+    fn edge_label(
+        &self,
+        edge_offset: usize,
+    ) -> &[u8] {
+        self.string_at(self.value(edge_offset + 20) as usize, self.value(edge_offset + 12) as usize)
+    }
+
+    fn string_at(
+        &self,
+        string_offset: usize,
+        string_len: usize,
+    ) -> &[u8] {
+        let start = self.strings_offset + string_offset;
+
+        &self.data.as_ref()[start..start + string_len]
+    }
+
+    fn checked_string(
+        &self,
+        offset: usize,
+    ) -> Result<&str, String> {
+        self.checked_string_at(self.value(offset) as usize, self.value(offset + 4) as usize)
+    }
+
+    fn checked_edge_label(
+        &self,
+        edge_offset: usize,
+    ) -> Result<&str, String> {
+        self.checked_string_at(self.value(edge_offset + 20) as usize, self.value(edge_offset + 12) as usize)
+    }
+
+    fn checked_string_at(
+        &self,
+        string_offset: usize,
+        string_len: usize,
+    ) -> Result<&str, String> {
+        if string_offset + string_len > self.strings_len {
+            return Err("compiled suffix list has a string out of bounds".to_string());
+        }
+
+        std::str::from_utf8(self.string_at(string_offset, string_len)).map_err(
+            |_| "compiled suffix list has an invalid string".to_string()
+        )
+    }
+
+    fn value(
+        &self,
+        offset: usize,
+    ) -> u32 {
+        read_u32(self.data.as_ref(), offset)
+    }
+}
+
+fn read_u32(
+    bytes: &[u8],
+    offset: usize,
+) -> u32 {
+    u32::from_le_bytes(bytes[offset..offset + 4].try_into().unwrap())
+}
+
+fn read_u64(
+    bytes: &[u8],
+    offset: usize,
+) -> u64 {
+    u64::from_le_bytes(bytes[offset..offset + 8].try_into().unwrap())
+}
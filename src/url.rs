@@ -0,0 +1,333 @@
+//! A single pass scanner of urls. It follows the WHATWG URL standard where it matters for
+//! locating the components, and leaves the validation of the host to the suffix list lookup.
+
+use crate::ExtractionError;
+use std::net::{Ipv4Addr, Ipv6Addr};
+use std::ops::Range;
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum HostKind {
+    Domain,
+    Ipv4,
+    Ipv6,
+}
+
+impl HostKind {
+    pub fn parse(
+        host_type: &str,
+    ) -> Option<Self> {
+        match host_type {
+            "domain" => Some(HostKind::Domain),
+            "ipv4" => Some(HostKind::Ipv4),
+            "ipv6" => Some(HostKind::Ipv6),
+            _ => None,
+        }
+    }
+
+    pub fn name(
+        &self,
+    ) -> &'static str {
+        match self {
+            HostKind::Domain => "domain",
+            HostKind::Ipv4 => "ipv4",
+            HostKind::Ipv6 => "ipv6",
+        }
+    }
+}
+
+/// The components of a url, as byte ranges of the url. The host range excludes the brackets
+/// of an IPv6 literal. Optional components are None when their delimiter is missing.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct UrlComponents {
+    pub scheme: Range<usize>,
+    pub userinfo: Option<Range<usize>>,
+    pub host: Range<usize>,
+    pub is_bracketed: bool,
+    pub port: Option<u16>,
+    pub path: Range<usize>,
+    pub query: Option<Range<usize>>,
+    pub fragment: Option<Range<usize>>,
+}
+
+/// A decoded host. Hosts that had to be percent decoded or normalized are kept aside,
+/// the others are read from their range of the url.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub struct UrlHost {
+    pub range: Range<usize>,
+    pub decoded: Option<String>,
+    pub kind: HostKind,
+}
+
+impl UrlHost {
+    pub fn as_str<'a>(
+        &'a self,
+        url: &'a str,
+    ) -> &'a str {
+        match &self.decoded {
+            Some(decoded) => decoded,
+            None => &url[self.range.clone()],
+        }
+    }
+}
+
+fn is_slash(
+    byte: u8,
+) -> bool {
+    byte == b'/' || byte == b'\\'
+}
+
+/// Scans the url once, from the scheme to the fragment. A url must either have a scheme followed by
+/// "//", or start with "//" itself, otherwise there is no way to tell its host from its path.
+/// Backslashes are read as slashes, and the leading and trailing spaces and control characters are ignored.
+pub fn scan_url(
+    url: &str,
+) -> Result<UrlComponents, ExtractionError> {
+    let bytes = url.as_bytes();
+
+    let mut start = 0;
+    let mut end = bytes.len();
+    while start < end && bytes[start] <= b' ' {
+        start += 1;
+    }
+    while end > start && bytes[end - 1] <= b' ' {
+        end -= 1;
+    }
+
+    let mut position = start;
+    if position < end && bytes[position].is_ascii_alphabetic() {
+        position += 1;
+        while position < end && (bytes[position].is_ascii_alphanumeric() || matches!(bytes[position], b'+' | b'-' | b'.')) {
+            position += 1;
+        }
+        if position == end || bytes[position] != b':' {
+            position = start;
+        }
+    }
+    let scheme = start..position;
+    if position > start {
+        position += 1;
+    }
+
+    if end - position < 2 || !is_slash(bytes[position]) || !is_slash(bytes[position + 1]) {
+        return Err(ExtractionError::NoScheme);
+    }
+    while position < end && is_slash(bytes[position]) {
+        position += 1;
+    }
+
+    let mut authority_end = match memchr::memchr3(b'/', b'?', b'#', &bytes[position..end]) {
+        Some(delimiter_index) => position + delimiter_index,
+        None => end,
+    };
+    if let Some(backslash_index) = memchr::memchr(b'\\', &bytes[position..authority_end]) {
+        authority_end = position + backslash_index;
+    }
+
+    // The userinfo ends at the last '@' as it may hold unescaped '@' itself
+    let userinfo = match memchr::memrchr(b'@', &bytes[position..authority_end]) {
+        Some(userinfo_end) => {
+            let userinfo = position..position + userinfo_end;
+            position += userinfo_end + 1;
+
+            Some(userinfo)
+        },
+        None => None,
+    };
+
+    let (host, is_bracketed, port_start) = if position < authority_end && bytes[position] == b'[' {
+        let host_end = match memchr::memchr(b']', &bytes[position..authority_end]) {
+            Some(bracket_index) => position + bracket_index,
+            None => return Err(ExtractionError::InvalidDomain),
+        };
+        let port_start = match &bytes[host_end + 1..authority_end] {
+            [] => None,
+            [b':', ..] => Some(host_end + 2),
+            _ => return Err(ExtractionError::InvalidDomain),
+        };
+
+        (position + 1..host_end, true, port_start)
+    } else {
+        match memchr::memchr(b':', &bytes[position..authority_end]) {
+            Some(port_separator) => (position..position + port_separator, false, Some(position + port_separator + 1)),
+            None => (position..authority_end, false, None),
+        }
+    };
+
+    let port = match port_start {
+        Some(port_start) => parse_port(&url[port_start..authority_end])?,
+        None => None,
+    };
+
+    let (query_start, fragment_start) = match memchr::memchr(b'#', &bytes[authority_end..end]) {
+        Some(fragment_index) => (
+            memchr::memchr(b'?', &bytes[authority_end..authority_end + fragment_index]).map(|query_index| authority_end + query_index),
+            Some(authority_end + fragment_index),
+        ),
+        None => (memchr::memchr(b'?', &bytes[authority_end..end]).map(|query_index| authority_end + query_index), None),
+    };
+    let path_end = query_start.or(fragment_start).unwrap_or(end);
+
+    Ok(
+        UrlComponents {
+            scheme,
+            userinfo,
+            host,
+            is_bracketed,
+            port,
+            path: authority_end..path_end,
+            query: query_start.map(|query_start| query_start + 1..fragment_start.unwrap_or(end)),
+            fragment: fragment_start.map(|fragment_start| fragment_start + 1..end),
+        }
+    )
+}
+
+/// An empty port is allowed and means no port at all
+fn parse_port(
+    port: &str,
+) -> Result<Option<u16>, ExtractionError> {
+    if port.is_empty() {
+        return Ok(None);
+    }
+    if !port.bytes().all(|byte| byte.is_ascii_digit()) {
+        return Err(ExtractionError::InvalidPort);
+    }
+
+    match port.trim_start_matches('0') {
+        "" => Ok(Some(0)),
+        port => port.parse().map(Some).map_err(|_| ExtractionError::InvalidPort),
+    }
+}
+
+/// Decodes the host of the scanned url. Percent encoded hosts are decoded, IP addresses are
+/// normalized to their usual form, and told apart from domains.
+pub fn decode_host(
+    url: &str,
+    components: &UrlComponents,
+) -> Result<UrlHost, ExtractionError> {
+    let range = components.host.clone();
+    let raw_host = &url[range.clone()];
+    if raw_host.is_empty() {
+        return Err(ExtractionError::NoDomain);
+    }
+
+    if components.is_bracketed {
+        let address: Ipv6Addr = raw_host.parse().map_err(|_| ExtractionError::InvalidDomain)?;
+
+        return Ok(
+            UrlHost {
+                range,
+                decoded: Some(address.to_string()),
+                kind: HostKind::Ipv6,
+            }
+        );
+    }
+
+    let mut decoded = if memchr::memchr(b'%', raw_host.as_bytes()).is_some() {
+        Some(percent_decode(raw_host)?)
+    } else {
+        None
+    };
+    let host = decoded.as_deref().unwrap_or(raw_host);
+
+    if host.is_empty() {
+        return Err(ExtractionError::NoDomain);
+    }
+    if host.len() > 255 {
+        return Err(ExtractionError::UrlTooLong);
+    }
+
+    let kind = match parse_ipv4(host) {
+        Some(address) => {
+            let address = address.to_string();
+            if address != host {
+                decoded = Some(address);
+            }
+
+            HostKind::Ipv4
+        },
+        None => HostKind::Domain,
+    };
+
+    Ok(UrlHost { range, decoded, kind })
+}
+
+/// Parses an IPv4 host as the WHATWG URL standard does, so hexadecimal, octal and shortened
+/// forms such as `0x7f.1`, `0177.0.0.1` or `2130706433` are addresses as well. Hosts that are
+/// not valid addresses, such as `256.256.256.256`, are left to be extracted as domains.
+fn parse_ipv4(
+    host: &str,
+) -> Option<Ipv4Addr> {
+    let host = host.strip_suffix('.').filter(|host| !host.is_empty()).unwrap_or(host);
+
+    // Most hosts are domains, which are told apart by their last label alone
+    let last_part = host.rsplit('.').next().unwrap_or_default();
+    let ends_in_number = match last_part.strip_prefix("0x").or_else(|| last_part.strip_prefix("0X")) {
+        Some(hex_digits) => hex_digits.bytes().all(|byte| byte.is_ascii_hexdigit()),
+        None => !last_part.is_empty() && last_part.bytes().all(|byte| byte.is_ascii_digit()),
+    };
+    if !ends_in_number {
+        return None;
+    }
+
+    let mut numbers = [0; 4];
+    let mut numbers_count = 0;
+    for part in host.split('.') {
+        *numbers.get_mut(numbers_count)? = parse_ipv4_number(part)?;
+        numbers_count += 1;
+    }
+
+    // Every number but the last is a byte, and the last one fills the remaining bytes
+    let (last_number, leading_numbers) = numbers[..numbers_count].split_last()?;
+    if leading_numbers.iter().any(|&number| number > 255) || *last_number >> (8 * (5 - numbers_count)) != 0 {
+        return None;
+    }
+    let address = leading_numbers
+        .iter()
+        .enumerate()
+        .fold(*last_number, |address, (index, number)| address | number << (8 * (3 - index)));
+
+    u32::try_from(address).ok().map(Ipv4Addr::from)
+}
+
+fn parse_ipv4_number(
+    part: &str,
+) -> Option<u64> {
+    let (digits, radix) = match part.strip_prefix("0x").or_else(|| part.strip_prefix("0X")) {
+        Some(hex_digits) => (hex_digits, 16),
+        None if part.len() > 1 && part.starts_with('0') => (&part[1..], 8),
+        None => (part, 10),
+    };
+    if part.is_empty() || !digits.chars().all(|character| character.is_digit(radix)) {
+        return None;
+    }
+    if digits.is_empty() {
+        return Some(0);
+    }
+
+    u64::from_str_radix(digits, radix).ok()
+}
+
+fn percent_decode(
+    encoded: &str,
+) -> Result<String, ExtractionError> {
+    let encoded = encoded.as_bytes();
+    let mut decoded = Vec::with_capacity(encoded.len());
+
+    let mut position = 0;
+    while let Some(percent_index) = memchr::memchr(b'%', &encoded[position..]) {
+        let percent_position = position + percent_index;
+        decoded.extend_from_slice(&encoded[position..percent_position]);
+
+        let hex_digits = encoded.get(percent_position + 1..percent_position + 3).ok_or(ExtractionError::InvalidDomain)?;
+        let hex_digits = std::str::from_utf8(hex_digits).map_err(|_| ExtractionError::InvalidDomain)?;
+        if !hex_digits.bytes().all(|byte| byte.is_ascii_hexdigit()) {
+            return Err(ExtractionError::InvalidDomain);
+        }
+        decoded.push(u8::from_str_radix(hex_digits, 16).map_err(|_| ExtractionError::InvalidDomain)?);
+
+        position = percent_position + 3;
+    }
+    decoded.extend_from_slice(&encoded[position..]);
+
+    String::from_utf8(decoded).map_err(|_| ExtractionError::InvalidDomain)
+}